@@ -4,10 +4,126 @@ Updated implementation that loads anomaly_model.pkl with 5-feature compatibility
 """
 
 import os
-import joblib
+import json
 import numpy as np
 from datetime import datetime
 
+from model_cache import load_model
+
+
+# Model input schema (column order of the feature matrix)
+FEATURE_KEYS = ('cpu_percent', 'memory_percent', 'memory_used_gb', 'disk_read_mb', 'disk_write_mb')
+
+# Rule-based fallback thresholds, applied as whole-column comparisons
+CPU_THRESHOLD = 95  # percent; crypto mining pattern
+MEMORY_THRESHOLD = 90  # percent; memory leak pattern
+IO_THRESHOLD_MB = 1000  # read or write MB; unusual I/O
+
+# Compiled-forest layout: node arrays stored as .npy, scalars in meta.json
+FLAT_ARRAYS = ('feature', 'threshold', 'left', 'right', 'leaf_value', 'roots')
+FLAT_META = ('max_depth', 'n_features', 'denominator', 'offset')
+
+
+def _source_signature(path):
+    """(st_mtime_ns, st_size) of the pickle an export was made from, or None if absent."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _average_path_length(n_samples):
+    """Expected isolation path length c(n) for leaves holding n training samples."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def _compile_isolation_forest(model):
+    """
+    Flatten a fitted IsolationForest into contiguous node arrays.
+
+    Every tree is appended to one set of arrays with child pointers rebased
+    to global node ids, split features mapped back to input columns, and each
+    leaf carrying its full path-length contribution (depth + c(leaf size)).
+    Scoring then walks all trees for all samples at once in NumPy instead of
+    going through sklearn's per-tree apply() loop.
+
+    Returns:
+        dict of flat arrays, or None if the model is not an IsolationForest
+    """
+    try:
+        from sklearn.ensemble import IsolationForest
+    except ImportError:
+        return None
+    if not isinstance(model, IsolationForest):
+        return None
+
+    feature, threshold, left, right, leaf_value, roots = [], [], [], [], [], []
+    max_depth = 0
+    base = 0
+    for tree, columns in zip(model.estimators_, model.estimators_features_):
+        t = tree.tree_
+        n_nodes = t.node_count
+        is_leaf = t.children_left == -1
+
+        # Depth of every node (children always have larger ids than parents)
+        depth = np.zeros(n_nodes, dtype=np.float64)
+        for node in range(n_nodes):
+            if not is_leaf[node]:
+                depth[t.children_left[node]] = depth[node] + 1
+                depth[t.children_right[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        node_ids = np.arange(n_nodes, dtype=np.intp)
+        feature.append(np.where(is_leaf, 0, np.asarray(columns)[np.maximum(t.feature, 0)]))
+        threshold.append(t.threshold)
+        # Leaves point to themselves so extra traversal steps are no-ops
+        left.append(np.where(is_leaf, node_ids, t.children_left) + base)
+        right.append(np.where(is_leaf, node_ids, t.children_right) + base)
+        leaf_value.append(np.where(is_leaf, depth + _average_path_length(t.n_node_samples), 0.0))
+        roots.append(base)
+        base += n_nodes
+
+    n_trees = len(roots)
+    return {
+        'feature': np.concatenate(feature).astype(np.intp),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'left': np.concatenate(left).astype(np.intp),
+        'right': np.concatenate(right).astype(np.intp),
+        'leaf_value': np.concatenate(leaf_value),
+        'roots': np.asarray(roots, dtype=np.intp),
+        'max_depth': max_depth,
+        'n_features': int(model.n_features_in_),
+        'denominator': n_trees * float(_average_path_length([model.max_samples_])[0]),
+        'offset': float(model.offset_),
+    }
+
+
+def _flat_decision_function(forest, features):
+    """IsolationForest.decision_function() evaluated on a compiled forest."""
+    # sklearn's trees compare float32 inputs against float64 thresholds
+    X = np.asarray(features, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != forest['n_features']:
+        raise ValueError(f"X has shape {X.shape}, but the model expects {forest['n_features']} features")
+
+    rows = np.arange(X.shape[0])[:, None]
+    nodes = np.broadcast_to(forest['roots'], (X.shape[0], len(forest['roots'])))
+    for _ in range(forest['max_depth']):
+        go_left = X[rows, forest['feature'][nodes]] <= forest['threshold'][nodes]
+        nodes = np.where(go_left, forest['left'][nodes], forest['right'][nodes])
+
+    depths = forest['leaf_value'][nodes].sum(axis=1)
+    if forest['denominator'] > 0:
+        scores = -(2.0 ** (-depths / forest['denominator']))
+    else:
+        scores = np.full(X.shape[0], -0.5)
+    return scores - forest['offset']
+
 
 class AnomalyDetector:
     """Detects security anomalies using a pre-trained model."""
@@ -18,16 +134,31 @@ class AnomalyDetector:
             backend_dir = os.path.dirname(os.path.abspath(__file__))
             model_path = os.path.join(backend_dir, 'models', 'anomaly_model.pkl')
         self.model_path = model_path
+        # Array-only export of the same model (see export_flat)
+        self.flat_model_path = os.path.splitext(model_path)[0] + '_flat'
         self.model = None
         self.model_loaded = False
+        self._fast_predict = None
         self._load_model()
     
     def _load_model(self):
         """Load the anomaly detection model if it exists."""
+        if os.path.exists(os.path.join(self.flat_model_path, 'meta.json')):
+            try:
+                self._fast_predict = self._load_flat(self.flat_model_path,
+                                                     _source_signature(self.model_path))
+                self.model_loaded = True
+                print(f"Anomaly model memory-mapped from {self.flat_model_path}")
+                return
+            except Exception as e:
+                print(f"Error loading flat anomaly model, falling back to pickle: {e}")
+                self._fast_predict = None
+        
         if os.path.exists(self.model_path):
             try:
-                self.model = joblib.load(self.model_path)
+                self.model = load_model(self.model_path, mmap_mode='r')
                 self.model_loaded = True
+                self._fast_predict = _compile_isolation_forest(self.model)
                 print(f"Anomaly model loaded from {self.model_path}")
             except Exception as e:
                 print(f"Error loading anomaly model: {e}")
@@ -37,16 +168,70 @@ class AnomalyDetector:
             print("Model not loaded - using placeholder logic")
             self.model_loaded = False
     
+    @staticmethod
+    def _load_flat(dirpath, source=None):
+        """
+        Memory-map a compiled forest written by export_flat().
+
+        Raises ValueError if the export was made from a different version of
+        the pickle than the one at source (e.g. the model was retrained).
+        """
+        with open(os.path.join(dirpath, 'meta.json')) as f:
+            meta = json.load(f)
+        if source is not None and meta.get('source') != source:
+            raise ValueError('export is stale: the pickle changed since export_flat()')
+        forest = {key: meta[key] for key in FLAT_META}
+        for name in FLAT_ARRAYS:
+            forest[name] = np.load(os.path.join(dirpath, f'{name}.npy'), mmap_mode='r')
+        return forest
+    
+    def export_flat(self, dirpath=None):
+        """
+        Write the loaded IsolationForest as plain .npy arrays.
+
+        Once exported, _load_model() memory-maps these arrays instead of
+        unpickling the estimator, so startup does not depend on the pickle
+        or the sklearn version, and every worker shares one copy of the
+        trees through the page cache. The export records the pickle's
+        mtime and size and is ignored once the pickle changes, so re-run
+        this after retraining (train_anomaly_model.py does it for you).
+
+        Args:
+            dirpath: Target directory (defaults to <model name>_flat next to the pickle)
+
+        Returns:
+            str: The directory written
+        """
+        if self._fast_predict is None:
+            raise ValueError('Only a loaded IsolationForest model can be exported')
+        
+        dirpath = dirpath or self.flat_model_path
+        os.makedirs(dirpath, exist_ok=True)
+        for name in FLAT_ARRAYS:
+            np.save(os.path.join(dirpath, f'{name}.npy'), np.ascontiguousarray(self._fast_predict[name]))
+        # meta.json last: its presence marks the export as complete
+        with open(os.path.join(dirpath, 'meta.json'), 'w') as f:
+            meta = {key: self._fast_predict[key] for key in FLAT_META}
+            meta['source'] = _source_signature(self.model_path)
+            json.dump(meta, f)
+        return dirpath
+    
     def detect(self, metrics):
         """Flask-compatible detect() method for PhaseSentinel."""
         return self.detect_anomalies(metrics)
     
-    def detect_anomalies(self, metrics_data):
+    def detect_anomalies(self, metrics_data, return_scores=True):
         """
         Detect security anomalies in metrics data.
         
         Args:
-            metrics_data: List of dictionaries containing metrics, or numpy array
+            metrics_data: List of dictionaries containing metrics, or an
+                (n, 5) numpy array already in FEATURE_KEYS column order.
+                Arrays skip feature extraction entirely, so batch callers
+                that already hold a matrix should pass it directly.
+            return_scores: Include per-sample anomaly scores in the result.
+                Models whose labels are not derived from their scores need
+                a second pass to produce them, which is skipped when False.
             
         Returns:
             dict: Anomaly detection results
@@ -56,47 +241,103 @@ class AnomalyDetector:
         
         try:
             # Convert metrics to feature array if needed
-            if isinstance(metrics_data, list):
-                features = self._extract_features(metrics_data)
-            else:
+            if isinstance(metrics_data, np.ndarray):
                 features = metrics_data
+            else:
+                features = self._extract_features(metrics_data)
+            
+            predictions, anomaly_scores = self._score(features, return_scores)
+            return self._model_results(features, predictions, anomaly_scores, return_scores)
             
+        except Exception as e:
+            return self._error_result(e)
+    
+    def detect_anomalies_batch(self, feature_blocks, return_scores=True):
+        """
+        Run detection for several independent requests in one model pass.
+        
+        Args:
+            feature_blocks: List of (n_i, 5) feature matrices
+            return_scores: As for detect_anomalies(); either one flag for
+                every block or a list with one flag per block
+            
+        Returns:
+            list: One detect_anomalies()-style result dict per block
+        """
+        if not self.model_loaded:
+            return [self._placeholder_detection(block) for block in feature_blocks]
+        
+        if isinstance(return_scores, bool):
+            return_scores = [return_scores] * len(feature_blocks)
+        
+        try:
+            stacked = np.vstack(feature_blocks)
+            # Scores are computed for the whole pass if any block wants them
+            predictions, anomaly_scores = self._score(stacked, any(return_scores))
+        except Exception as e:
+            return [self._error_result(e) for _ in feature_blocks]
+        
+        # Scatter the stacked outputs back to their requests
+        bounds = np.cumsum([len(block) for block in feature_blocks])[:-1]
+        pred_parts = np.split(predictions, bounds)
+        score_parts = np.split(anomaly_scores, bounds) if anomaly_scores is not None else [None] * len(feature_blocks)
+        return [self._model_results(block, preds, scores, wants_scores)
+                for block, preds, scores, wants_scores
+                in zip(feature_blocks, pred_parts, score_parts, return_scores)]
+    
+    def _score(self, features, return_scores):
+        """Return (predictions, anomaly_scores) for a feature matrix."""
+        if self._fast_predict is not None:
+            # Compiled IsolationForest: one traversal yields scores and labels
+            anomaly_scores = _flat_decision_function(self._fast_predict, features)
+            predictions = np.where(anomaly_scores < 0, -1, 1)
+        elif getattr(self.model, '_estimator_type', None) == 'outlier_detector' and hasattr(self.model, 'decision_function'):
+            # sklearn outlier detectors label a sample -1 exactly when its
+            # decision_function is negative, so one pass gives both
+            anomaly_scores = self.model.decision_function(features)
+            predictions = np.where(anomaly_scores < 0, -1, 1)
+        else:
             # Predict anomalies using the model
             predictions = self.model.predict(features)
             anomaly_scores = None
             
-            # Get anomaly scores if available (Isolation Forest, etc.)
-            if hasattr(self.model, 'decision_function'):
-                anomaly_scores = self.model.decision_function(features)
-            elif hasattr(self.model, 'score_samples'):
-                anomaly_scores = self.model.score_samples(features)
-            
-            # Identify anomalous samples
-            anomalous_indices = np.where(predictions == -1)[0] if hasattr(predictions, '__iter__') else []
-            
-            results = {
-                'timestamp': datetime.now().isoformat(),
-                'model_loaded': True,
-                'total_samples': len(features) if hasattr(features, '__len__') else 1,
-                'anomalies_detected': len(anomalous_indices),
-                'anomalous_indices': anomalous_indices.tolist() if len(anomalous_indices) > 0 else [],
-                'anomaly_scores': anomaly_scores.tolist() if anomaly_scores is not None else None,
-                'alerts': self._generate_alerts(anomalous_indices, anomaly_scores, metrics_data)
-            }
-            
-            return results
-            
-        except Exception as e:
-            return {
-                'timestamp': datetime.now().isoformat(),
-                'model_loaded': True,
-                'error': str(e),
-                'anomalies_detected': 0,
-                'alerts': [{
-                    'type': 'error',
-                    'message': f'Error during anomaly detection: {e}'
-                }]
-            }
+            # Get anomaly scores if requested and available
+            if return_scores:
+                if hasattr(self.model, 'decision_function'):
+                    anomaly_scores = self.model.decision_function(features)
+                elif hasattr(self.model, 'score_samples'):
+                    anomaly_scores = self.model.score_samples(features)
+        
+        return np.asarray(predictions), anomaly_scores
+    
+    def _model_results(self, features, predictions, anomaly_scores, return_scores):
+        """Build the result dict for one request from its model outputs."""
+        # Identify anomalous samples
+        anomalous_indices = np.flatnonzero(predictions == -1)
+        
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'model_loaded': True,
+            'total_samples': len(features),
+            'anomalies_detected': len(anomalous_indices),
+            # Kept as ndarrays; the API layer serializes them without a list copy
+            'anomalous_indices': anomalous_indices,
+            'anomaly_scores': anomaly_scores if return_scores else None,
+            'alerts': self._generate_alerts(anomalous_indices, anomaly_scores, features)
+        }
+    
+    def _error_result(self, e):
+        """Result dict reported when the model fails on the input."""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'model_loaded': True,
+            'error': str(e),
+            'anomalies_detected': 0,
+            'alerts': [{
+                'type': 'error',
+                'message': f'Error during anomaly detection: {e}'
+            }]
+        }
     
     def _placeholder_detection(self, metrics_data):
         """
@@ -119,41 +360,54 @@ class AnomalyDetector:
         anomalies_detected = 0
         
         # Rule-based anomaly detection
-        if isinstance(metrics_data, list):
-            for idx, metric in enumerate(metrics_data):
-                # Check for suspicious CPU usage (crypto mining pattern)
-                cpu = float(metric.get('cpu_percent', 0))
-                if cpu > 95:
-                    alerts.append({
-                        'type': 'warning',
-                        'message': f'Sample {idx}: Extremely high CPU usage ({cpu:.1f}%) - possible crypto mining activity',
-                        'sample_index': idx,
-                        'severity': 'high'
-                    })
-                    anomalies_detected += 1
-                
-                # Check for memory leak pattern
-                memory = float(metric.get('memory_percent', 0))
-                if memory > 90:
-                    alerts.append({
-                        'type': 'warning',
-                        'message': f'Sample {idx}: Critical memory usage ({memory:.1f}%) - possible memory leak',
-                        'sample_index': idx,
-                        'severity': 'high'
-                    })
-                    anomalies_detected += 1
-                
-                # Check for unusual I/O patterns
-                disk_read = float(metric.get('disk_read_mb', 0))
-                disk_write = float(metric.get('disk_write_mb', 0))
-                if disk_read > 1000 or disk_write > 1000:
-                    alerts.append({
-                        'type': 'warning',
-                        'message': f'Sample {idx}: Unusual I/O activity (Read: {disk_read:.1f}MB, Write: {disk_write:.1f}MB)',
-                        'sample_index': idx,
-                        'severity': 'medium'
-                    })
-                    anomalies_detected += 1
+        if isinstance(metrics_data, np.ndarray):
+            features = metrics_data
+        elif isinstance(metrics_data, list):
+            features = self._extract_features(metrics_data)
+        else:
+            features = None
+        
+        if features is not None:
+            cpu_col = features[:, 0]
+            mem_col = features[:, 1]
+            read_col = features[:, 3]
+            write_col = features[:, 4]
+
+            # Evaluate every rule as a column comparison; only flagged
+            # samples fall through to the per-alert Python formatting below
+            cpu_mask = cpu_col > CPU_THRESHOLD
+            mem_mask = mem_col > MEMORY_THRESHOLD
+            io_mask = (read_col > IO_THRESHOLD_MB) | (write_col > IO_THRESHOLD_MB)
+
+            cpu_idx = np.flatnonzero(cpu_mask)
+            mem_idx = np.flatnonzero(mem_mask)
+            io_idx = np.flatnonzero(io_mask)
+            anomalies_detected = len(cpu_idx) + len(mem_idx) + len(io_idx)
+
+            # Format each rule's messages from one template over the flagged
+            # values; tolist() yields Python scalars so %-formatting stays in C
+            messages = [
+                'Sample %d: Extremely high CPU usage (%.1f%%) - possible crypto mining activity' % args
+                for args in zip(cpu_idx.tolist(), cpu_col[cpu_idx].tolist())
+            ] + [
+                'Sample %d: Critical memory usage (%.1f%%) - possible memory leak' % args
+                for args in zip(mem_idx.tolist(), mem_col[mem_idx].tolist())
+            ] + [
+                'Sample %d: Unusual I/O activity (Read: %.1fMB, Write: %.1fMB)' % args
+                for args in zip(io_idx.tolist(), read_col[io_idx].tolist(), write_col[io_idx].tolist())
+            ]
+            sample_indices = np.concatenate([cpu_idx, mem_idx, io_idx])
+            severities = ['high'] * (len(cpu_idx) + len(mem_idx)) + ['medium'] * len(io_idx)
+
+            # Stable sort by sample keeps the cpu, memory, I/O order within a sample
+            order = np.argsort(sample_indices, kind='stable').tolist()
+            sample_indices = sample_indices.tolist()
+            alerts = [{
+                'type': 'warning',
+                'message': messages[k],
+                'sample_index': sample_indices[k],
+                'severity': severities[k]
+            } for k in order]
         
         if anomalies_detected == 0:
             alerts.append({
@@ -164,69 +418,80 @@ class AnomalyDetector:
         return {
             'timestamp': datetime.now().isoformat(),
             'model_loaded': False,
-            'total_samples': len(metrics_data) if isinstance(metrics_data, list) else 1,
+            'total_samples': len(features) if features is not None else 1,
             'anomalies_detected': anomalies_detected,
             'alerts': alerts,
             'warning': 'Using placeholder detection. Model not loaded.'
         }
     
-    def _extract_features(self, metrics_data):
+    def _extract_features(self, metrics_data, out=None):
         """
         Extract features from metrics data for model input.
-        
+
         Args:
             metrics_data: List of metric dictionaries
-            
+            out: Optional preallocated (n, 5) float32 array to fill in place
+
         Returns:
             numpy.ndarray: Feature matrix
         """
-        features = []
-        for metric in metrics_data:
-            feature_vector = [
-                float(metric.get('cpu_percent', 0)),
-                float(metric.get('memory_percent', 0)),
-                float(metric.get('memory_used_gb', 0)),
-                float(metric.get('disk_read_mb', 0)),
-                float(metric.get('disk_write_mb', 0))
-            ]
-            features.append(feature_vector)
-        
-        return np.array(features)
+        n = len(metrics_data)
+        if out is None or out.shape != (n, len(FEATURE_KEYS)):
+            out = np.empty((n, len(FEATURE_KEYS)), dtype=np.float32)
+
+        # Fill column-by-column; np.fromiter converts each value in C and
+        # streams it into the column without an intermediate Python list
+        for j, key in enumerate(FEATURE_KEYS):
+            out[:, j] = np.fromiter((metric.get(key, 0) for metric in metrics_data),
+                                    dtype=np.float32, count=n)
+
+        return out
     
-    def _generate_alerts(self, anomalous_indices, anomaly_scores, metrics_data):
-        """Generate alert messages for detected anomalies."""
-        alerts = []
-        
+    def _generate_alerts(self, anomalous_indices, anomaly_scores, features):
+        """
+        Generate alert messages for detected anomalies.
+
+        Alert details are read from the cpu/memory columns of the feature
+        matrix, so the raw metric dicts need not be kept around for this.
+        """
         if len(anomalous_indices) == 0:
-            alerts.append({
+            return [{
                 'type': 'info',
                 'message': 'No security anomalies detected'
-            })
-            return alerts
+            }]
         
-        for idx in anomalous_indices:
-            score = None
-            if anomaly_scores is not None and idx < len(anomaly_scores):
-                score = float(anomaly_scores[idx])
-            
-            alert = {
-                'type': 'warning',
-                'message': f'Security anomaly detected in sample {idx}',
-                'sample_index': int(idx),
-                'severity': 'high' if score and score < -0.5 else 'medium'
-            }
-            
-            if score is not None:
-                alert['anomaly_score'] = score
-            
-            if isinstance(metrics_data, list) and idx < len(metrics_data):
-                metric = metrics_data[idx]
-                alert['details'] = {
-                    'cpu_percent': metric.get('cpu_percent', 'N/A'),
-                    'memory_percent': metric.get('memory_percent', 'N/A')
-                }
-            
-            alerts.append(alert)
+        indices = [int(idx) for idx in anomalous_indices]
+        
+        # Gather scores and severities for all flagged samples in one shot
+        if anomaly_scores is not None:
+            sel_scores = np.asarray(anomaly_scores, dtype=np.float64)[indices]
+            severities = np.where(sel_scores < -0.5, 'high', 'medium').tolist()
+            sel_scores = sel_scores.tolist()
+        else:
+            sel_scores = [None] * len(indices)
+            severities = ['medium'] * len(indices)
+        
+        detail_cols = features[indices, :2]
+        if detail_cols.dtype == np.float32:
+            # Widen through the shortest float32 repr, so 10.3 is reported
+            # as 10.3 rather than the float32 value 10.300000190734863
+            detail_cols = detail_cols.astype(str).astype(np.float64)
+        cpu_col = detail_cols[:, 0].tolist()
+        mem_col = detail_cols[:, 1].tolist()
+        details = [{
+            'cpu_percent': cpu,
+            'memory_percent': mem
+        } for cpu, mem in zip(cpu_col, mem_col)]
+        
+        # Build every alert with the same keys in the same order
+        alerts = [{
+            'type': 'warning',
+            'message': f'Security anomaly detected in sample {idx}',
+            'sample_index': idx,
+            'severity': severities[k],
+            'anomaly_score': sel_scores[k],
+            'details': details[k]
+        } for k, idx in enumerate(indices)]
         
         return alerts
 
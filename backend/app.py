@@ -4,39 +4,73 @@ Handles API endpoints, serves frontend templates, and orchestrates profiling,
 deadlock detection, anomaly detection, and optimization recommendations.
 """
 
-from flask import Flask, render_template, jsonify, request, send_file, redirect, url_for
+from flask import Flask, render_template, jsonify, request, send_file, redirect, url_for, stream_with_context, make_response
 import os
-import json
 import csv
+import io
+import numpy as np
+import pandas as pd
+import orjson
 from datetime import datetime
 import subprocess
 import sys
+import tempfile
 import psutil
 import threading
 import time
 import random
-from collections import defaultdict, deque
+import heapq
+import itertools
+import hashlib
+import struct
+from collections import Counter, defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import asyncio
 from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
 
 # Import PhaseSentinel modules
 from phaseprofiler import PhasProfiler
 from deadlock_detector_new import DeadlockDetector
-from anomaly_detector import AnomalyDetector
+from anomaly_detector import AnomalyDetector, CPU_THRESHOLD, MEMORY_THRESHOLD, IO_THRESHOLD_MB
 from recommender import OptimizationRecommender
 from bottleneck_classifier import BottleneckClassifier
+from inference_batcher import InferenceBatcher
+from proc_sampler import ProcessSampler
+from metric_store import MetricStore, _PHASE_IDS, _UNKNOWN_PHASE
+from csv_utils import open_data_file, csv_header, count_csv_rows
+from orjson_provider import ORJSONProvider, ORJSONCodec
 
 # Initialize Flask app with SocketIO
 app = Flask(__name__, 
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+app.json = ORJSONProvider(app)
+# Profiling loops run on real threads (profiling_executor, gunicorn gthread),
+# so the async mode is pinned rather than auto-selected: an installed
+# eventlet/gevent without monkey patching would stall emits from those threads
+socketio = SocketIO(app, json=ORJSONCodec, async_mode='threading',
+                    cors_allowed_origins="*", logger=True, engineio_logger=True)
 
 # Global variables for PID-scoped data management
 active_profiles = {}  # Dictionary to store active profiling sessions
-profile_data = {}   # Dictionary to store collected metrics per PID
+profile_data = {}   # Dictionary to store collected metrics per PID (MetricStore)
+# Minimum number of samples kept per PID; longer sessions keep `duration`
+PROFILE_HISTORY_MIN = 600
 current_pid = None    # Currently active PID
-profiling_thread = None  # Thread for continuous profiling
+# Shared worker pool for continuous profiling loops; sessions beyond
+# max_workers queue until a running one finishes
+profiling_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='profiler')
+# psutil.Process handles reused across requests, keyed by PID
+_process_cache = {}
+_PROCESS_CACHE_SIZE = 1024
+_cpu_sampled = set()  # PIDs whose cached handle already holds a CPU baseline
+# Binary metric_update_packed frame: pid (uint32); timestamp, cpu %, memory %,
+# memory MB, disk read/write MB, network sent/recv MB (float32); phase id (uint8,
+# index into PhasProfiler.PHASES, _UNKNOWN_PHASE (255) if unknown). 37 bytes per sample.
+_PACKED_METRIC = struct.Struct('<I8fB')
+# Baseline for non-blocking psutil.cpu_percent() readings in /api/system
+psutil.cpu_percent(interval=None)
 
 
 # WebSocket event handlers
@@ -81,7 +115,12 @@ def handle_leave_profile_stream(data):
 
 @socketio.on('subscribe_to_profile_updates')
 def handle_subscribe_to_profile_updates(data):
-    """Subscribe to profile updates for a specific PID."""
+    """
+    Subscribe to profile updates for a specific PID.
+    metric_update is only sent to subscribers; pass pid='all' to receive it
+    for every profiled process. stream_type='metric_update_packed' delivers
+    the same samples as binary _PACKED_METRIC frames.
+    """
     pid = data.get('pid')
     stream_type = data.get('stream_type', 'metric_update')  # 'metric_update', 'deadlock', 'anomaly'
     
@@ -96,6 +135,31 @@ def handle_subscribe_to_profile_updates(data):
         })
 
 
+@socketio.on('subscribe_batch')
+def handle_subscribe_batch(data):
+    """
+    Subscribe to several streams for several PIDs in one message.
+    Expects {'pids': [...], 'stream_types': [...]} and joins every
+    '<stream_type>_<pid>' room, so a reconnecting client needs one round trip
+    instead of one per room. The rooms are collected first and joined in a
+    single pass; keep it that way so a message-queue backed manager can turn
+    it into one variadic SUBSCRIBE.
+    """
+    pids = [pid for pid in data.get('pids', []) if pid]
+    stream_types = data.get('stream_types') or ['metric_update']
+
+    rooms = [f'{stream_type}_{pid}' for pid in pids for stream_type in stream_types]
+    for room in rooms:
+        join_room(room)
+
+    emit('subscription_confirmed', {
+        'message': f'Subscribed to {len(rooms)} streams',
+        'pids': pids,
+        'stream_types': stream_types,
+        'timestamp': time.time()
+    })
+
+
 @socketio.on('unsubscribe_from_profile_updates')
 def handle_unsubscribe_from_profile_updates(data):
     """Unsubscribe from profile updates for a specific PID."""
@@ -115,17 +179,32 @@ def handle_unsubscribe_from_profile_updates(data):
 # Configuration
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'data')
 MODELS_FOLDER = os.path.join(os.path.dirname(__file__), 'models')
-ALLOWED_EXTENSIONS = {'py', 'txt', 'sh'}
+TRAINING_CSV = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
+TRAINING_CSV_GZ = TRAINING_CSV + '.gz'
+USER_DATA_DIR = os.path.join(UPLOAD_FOLDER, 'user_data')
+ANOMALY_MODEL = os.path.join(MODELS_FOLDER, 'anomaly_model (1).pkl')
+REGRESSION_MODEL = os.path.join(MODELS_FOLDER, 'regression_model.pkl')
+ALLOWED_EXTENSIONS = frozenset({'py', 'txt', 'sh'})
+_ALLOWED_SUFFIXES = frozenset('.' + ext for ext in ALLOWED_EXTENSIONS)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Store training_data.csv gzip-compressed (as training_data.csv.gz) when it is rewritten
+app.config['COMPRESS_TRAINING_DATA'] = os.environ.get('COMPRESS_TRAINING_DATA', '0') == '1'
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(MODELS_FOLDER, exist_ok=True)
 
 # Initialize detectors and recommenders
+# Shared for its stateless phase rules (detect_phase/detect_phases)
+phase_profiler = PhasProfiler()
 anomaly_detector = AnomalyDetector()
+# Concurrent API requests share model passes through one batching worker
+anomaly_batcher = InferenceBatcher(anomaly_detector)
+# Profiling sessions and the deadlock routes only read its lock graph, so one
+# instance serves all of them without locking
+deadlock_detector = DeadlockDetector()
 recommender = OptimizationRecommender()
 # Bottleneck classifier (loads regression_model.pkl if available)
 try:
@@ -134,9 +213,194 @@ except Exception:
     bottleneck_classifier = None
 
 
+def _get_bottleneck_classifier():
+    """Shared BottleneckClassifier, constructed on first use if startup construction failed."""
+    global bottleneck_classifier
+    if bottleneck_classifier is None:
+        bottleneck_classifier = BottleneckClassifier()
+    return bottleneck_classifier
+
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in _ALLOWED_SUFFIXES
+
+
+def _json_body():
+    """Parsed JSON object of the current request, or None if the body is missing or malformed."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def _snapshot_samples(pid, last=None):
+    """
+    A PID's samples as metric dicts, optionally only the last `last` of them.
+    """
+    samples = profile_data.get(pid)
+    if not samples:
+        return []
+    if last is None:
+        return samples.records()
+    return samples.tail(last)
+
+
+def _pack_metric(metric):
+    """Encode a profiling sample as a _PACKED_METRIC frame."""
+    return _PACKED_METRIC.pack(
+        metric['pid'], metric['timestamp'], metric['cpu_percent'], metric['memory_percent'],
+        metric['memory_used_mb'], metric['disk_read_mb'], metric['disk_write_mb'],
+        metric['network_sent_mb'], metric['network_recv_mb'],
+        _PHASE_IDS.get(metric['phase'], _UNKNOWN_PHASE))
+
+
+def _get_process(pid):
+    """
+    Cached psutil.Process for a PID.
+    is_running() compares the stored create time, so a PID reused by a new
+    process gets a fresh handle instead of the stale one.
+    """
+    process = _process_cache.get(pid)
+    if process is not None and process.is_running():
+        return process
+    process = psutil.Process(pid)
+    if len(_process_cache) >= _PROCESS_CACHE_SIZE:
+        _process_cache.clear()
+        _cpu_sampled.clear()
+    _process_cache[pid] = process
+    _cpu_sampled.discard(pid)
+    return process
+
+
+def _children_index():
+    """Map each PID to its child PIDs from a single pass over the process table."""
+    children_by_ppid = defaultdict(list)
+    for proc in psutil.process_iter(['ppid']):
+        ppid = proc.info['ppid']
+        if ppid is not None and ppid != proc.pid:
+            children_by_ppid[ppid].append(proc.pid)
+    return children_by_ppid
+
+
+def _process_cpu_percent(process):
+    """
+    CPU percent of a cached process handle without blocking: usage since the
+    previous reading, or the average over the process lifetime on the first.
+    """
+    if process.pid in _cpu_sampled:
+        return process.cpu_percent(interval=None)
+    process.cpu_percent(interval=None)  # Start the baseline for the next reading
+    _cpu_sampled.add(process.pid)
+    cpu_times = process.cpu_times()
+    elapsed = time.time() - process.create_time()
+    return (cpu_times.user + cpu_times.system) / elapsed * 100 if elapsed > 0 else 0.0
+
+
+def _profiling_active(profile_info):
+    """Whether the session's continuous profiling job is still queued or running."""
+    job = profile_info.get('job')
+    return job is not None and not job.done()
+
+
+# get_recommendations() is a pure function of (metrics, phase_type) apart
+# from its timestamp; dashboards re-post the same payloads, so memoize it
+_RECOMMENDATION_CACHE_SIZE = 1024
+_recommendation_cache = OrderedDict()
+_recommendation_cache_lock = threading.Lock()
+_recommendation_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def _cached_recommendations(metrics, phase_type=None):
+    """recommender.get_recommendations() memoized by a hash of its inputs."""
+    try:
+        payload = orjson.dumps(metrics, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    except TypeError:
+        return recommender.get_recommendations(metrics, phase_type)
+    key = hashlib.blake2b(payload + b'\0' + str(phase_type).encode(), digest_size=16).digest()
+    
+    with _recommendation_cache_lock:
+        cached = _recommendation_cache.get(key)
+        if cached is not None:
+            _recommendation_cache.move_to_end(key)
+            _recommendation_cache_stats['hits'] += 1
+            return dict(cached, timestamp=datetime.now().isoformat())
+        _recommendation_cache_stats['misses'] += 1
+    
+    results = recommender.get_recommendations(metrics, phase_type)
+    if 'error' not in results:
+        with _recommendation_cache_lock:
+            _recommendation_cache[key] = results
+            if len(_recommendation_cache) > _RECOMMENDATION_CACHE_SIZE:
+                _recommendation_cache.popitem(last=False)
+    return results
+
+
+def _read_job_output(f, max_bytes=64 * 1024):
+    """Return the last max_bytes of a profiled program's captured output."""
+    if f is None or f.closed:
+        return ''
+    f.seek(0, os.SEEK_END)
+    f.seek(max(0, f.tell() - max_bytes))
+    return f.read().decode('utf-8', errors='replace')
+
+
+def _stream_all_metrics(pids, batch_size=1000):
+    """Yield {"status", "metrics": {pid: [...]}, "pids"} as JSON chunks of batch_size samples."""
+    yield b'{"status":"success","metrics":{'
+    for n, pid in enumerate(pids):
+        # Samples appended while streaming are left for the next poll
+        samples = _snapshot_samples(pid)
+        end = len(samples)
+        yield (b',' if n else b'') + orjson.dumps(str(pid)) + b':['
+        for start in range(0, end, batch_size):
+            batch = samples[start:start + batch_size]
+            yield (b',' if start else b'') + b','.join([orjson.dumps(m) for m in batch])
+        yield b']'
+    yield b'},"pids":' + orjson.dumps([str(pid) for pid in pids]) + b'}'
+
+
+def _training_data_file():
+    """Path of the training data, preferring the gzip-compressed copy when present."""
+    if os.path.exists(TRAINING_CSV_GZ):
+        return TRAINING_CSV_GZ
+    return TRAINING_CSV
+
+
+@lru_cache(maxsize=4)
+def _load_training_records(csv_file, mtime):
+    """Parse a training CSV once per (path, mtime); callers must not mutate the records."""
+    # C-level parsing (gzip inferred from a .gz suffix); blank cells stay '' as with csv.DictReader
+    df = pd.read_csv(csv_file, keep_default_na=False, na_values=[])
+    return df.to_dict(orient='records')
+
+
+def _read_training_metrics():
+    """Load training_data.csv as a list of metric records (empty if missing)."""
+    csv_file = _training_data_file()
+    try:
+        mtime = os.path.getmtime(csv_file)
+    except OSError:
+        return []
+    # Rewrites (collect/merge) bump the mtime and miss the cache
+    return list(_load_training_records(csv_file, mtime))
+
+
+@lru_cache(maxsize=4)
+def _load_training_columns(csv_file, mtime, columns):
+    """Read-only float64 matrix of the given training CSV columns (missing or blank cells 0), parsed once per (path, mtime)."""
+    df = pd.read_csv(csv_file, usecols=lambda name: name in columns)
+    matrix = df.reindex(columns=list(columns)).fillna(0).to_numpy(dtype=np.float64)
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _read_training_columns(columns):
+    """Numeric columns of training_data.csv as an (n, len(columns)) matrix (None if missing)."""
+    csv_file = _training_data_file()
+    try:
+        mtime = os.path.getmtime(csv_file)
+    except OSError:
+        return None
+    return _load_training_columns(csv_file, mtime, columns)
 
 
 @app.route('/')
@@ -145,10 +409,32 @@ def index():
     return redirect(url_for('dashboard'))
 
 
+_rendered_pages = {}  # (template, script_root) -> (html bytes, etag)
+
+
+def _static_page(template):
+    """
+    Serve a template without per-request data, rendered once and revalidated by ETag.
+
+    Repeat visitors get a 304 instead of a re-render and a full transfer.
+    Pages are re-rendered every time in debug mode so template edits show up.
+    """
+    key = (template, request.script_root)
+    cached = None if app.debug else _rendered_pages.get(key)
+    if cached is None:
+        html = render_template(template).encode('utf-8')
+        cached = (html, hashlib.blake2b(html, digest_size=16).hexdigest())
+        _rendered_pages[key] = cached
+    
+    response = make_response(cached[0])
+    response.set_etag(cached[1])
+    return response.make_conditional(request)
+
+
 @app.route('/dashboard')
 def dashboard():
     """Interactive dashboard showing metrics, phases, bottlenecks, anomalies, and deadlocks."""
-    return render_template('dashboard.html')
+    return _static_page('dashboard.html')
 
 
 
@@ -156,9 +442,11 @@ def dashboard():
 @app.route('/api/profile/start', methods=['POST'])
 def start_profiling():
     """Start profiling a program and return its PID."""
-    global current_pid, profiling_thread
+    global current_pid
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         program_path = data.get('file_path')  # Changed to match frontend expectation
         duration = data.get('duration', 60)  # Default to 60 seconds if not specified
         
@@ -171,11 +459,19 @@ def start_profiling():
         if duration < 1 or duration > 300:
             return jsonify({'error': 'Duration must be between 1 and 300 seconds'}), 400
         
-        # Start the program as a subprocess
+        # Start the program as a subprocess. Output goes to temp files rather
+        # than pipes nobody drains, which would stall a chatty program once
+        # the pipe buffer fills; the job status route serves it afterwards.
+        # stdin is closed and the child gets its own session, so it cannot
+        # read from or receive terminal signals meant for the server
+        stdout_file = tempfile.TemporaryFile()
+        stderr_file = tempfile.TemporaryFile()
         process = subprocess.Popen(
             [sys.executable, program_path] if program_path.endswith('.py') else [program_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
+            stdin=subprocess.DEVNULL,
+            stdout=stdout_file,
+            stderr=stderr_file,
+            start_new_session=True
         )
         
         # Store the PID and process info
@@ -185,6 +481,7 @@ def start_profiling():
         # Initialize data storage for this PID
         active_profiles[pid] = {
             'process': process,
+            'output': (stdout_file, stderr_file),
             'start_time': time.time(),
             'program_path': program_path,
             'duration': duration,
@@ -193,22 +490,23 @@ def start_profiling():
             'anomalies': [],
             'deadlocks': []
         }
+        # Samples arrive about once a second; older ones drop off the left
+        profile_data[pid] = MetricStore(pid, max(int(duration), PROFILE_HISTORY_MIN),
+                                        active_profiles[pid]['start_time'])
         
-        # Start continuous profiling in a separate thread
-        if profiling_thread and profiling_thread.is_alive():
-            profiling_thread.join(timeout=1)
-        
-        profiling_thread = threading.Thread(target=continuous_profiling, args=(pid,), daemon=True)
-        profiling_thread.start()
+        # Hand the sampling loop to the pool and return right away; the
+        # PID doubles as the job id for GET /api/profile?pid=<pid>
+        active_profiles[pid]['job'] = profiling_executor.submit(continuous_profiling, pid)
         
         return jsonify({
             'status': 'success',
             'message': f'Profiling started for {duration} seconds',
             'pid': pid,
+            'job_id': pid,
             'program_path': program_path,
             'duration': duration,
             'expected_end_time': time.time() + duration
-        })
+        }), 202
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -236,7 +534,10 @@ def stop_profiling():
             active_profiles[current_pid]['running'] = False
             
             # Clean up
+            for f in active_profiles[current_pid].get('output', ()):
+                f.close()
             del active_profiles[current_pid]
+            _waitfor_cache.pop(current_pid, None)
             current_pid = None
             
         return jsonify({'status': 'success', 'message': 'Profiling stopped'})
@@ -256,53 +557,35 @@ def continuous_profiling(pid):
     duration = process_info.get('duration', 60)  # Default to 60 seconds
     expected_end_time = start_time + duration
     
-    profiler = PhasProfiler()
-    anomaly_detector = AnomalyDetector()
-    deadlock_detector = DeadlockDetector()
+    # Detectors are shared across sessions; per-PID results live in process_info
+    profiler = phase_profiler
+    # Created by start_profiling; bound once instead of looked up per sample
+    samples = profile_data[pid]
     
-    while pid in active_profiles and process.poll() is None and time.time() < expected_end_time:
+    try:
+        sampler = ProcessSampler(pid)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        sampler = None
+    
+    while sampler is not None and pid in active_profiles and process.poll() is None and time.time() < expected_end_time:
         try:
-            # Get process metrics
-            p = psutil.Process(pid)
-            
-            # Collect metrics - use interval=0.1 for responsive CPU sampling
-            cpu_percent = p.cpu_percent(interval=0.1)
-            
-            memory_info = p.memory_info()
-            memory_percent = p.memory_percent()
-            
-            # Get I/O stats
-            io_counters = p.io_counters() if p.is_running() else None
-            disk_read_mb = io_counters.read_bytes / (1024**2) if io_counters else 0
-            disk_write_mb = io_counters.write_bytes / (1024**2) if io_counters else 0
-            
-            # Get network stats
-            net_io = psutil.net_io_counters()
-            net_sent = net_io.bytes_sent / (1024**2) if net_io else 0
-            net_recv = net_io.bytes_recv / (1024**2) if net_io else 0
+            # Get process metrics from the cached /proc descriptors
+            sample = sampler.sample()
             
             # Calculate phase
-            phase = profiler.detect_phase(cpu_percent, memory_percent, disk_read_mb + disk_write_mb)
+            phase = profiler.detect_phase(sample['cpu_percent'], sample['memory_percent'],
+                                          sample['disk_read_mb'] + sample['disk_write_mb'])
             
             # Create metric entry
-            metric = {
-                'timestamp': time.time() - start_time,
-                'cpu_percent': cpu_percent,
-                'memory_percent': memory_percent,
-                'memory_used_mb': memory_info.rss / (1024**2) if p.is_running() else 0,
-                'disk_read_mb': disk_read_mb,
-                'disk_write_mb': disk_write_mb,
-                'network_sent_mb': net_sent,
-                'network_recv_mb': net_recv,
-                'phase': phase,
-                'pid': pid
-            }
+            metric = {'timestamp': time.time() - start_time, **sample, 'phase': phase, 'pid': pid}
             
             # Store metric
-            profile_data.setdefault(pid, []).append(metric)
+            samples.append(metric)
             
-            # Detect anomalies
-            anomaly_results = anomaly_detector.detect_anomalies([metric])
+            # Detect anomalies; samples from concurrent sessions that arrive
+            # within the batcher's window share one model pass; only the
+            # alerts are used here, so per-sample scores are skipped
+            anomaly_results = anomaly_batcher.detect([metric], return_scores=False)
             if anomaly_results['anomalies_detected'] > 0:
                 process_info['anomalies'].extend(anomaly_results['alerts'])
             
@@ -310,23 +593,18 @@ def continuous_profiling(pid):
             deadlock_results = deadlock_detector.analyze_deadlock_risk(pid=pid)
             if deadlock_results['has_cycles']:
                 process_info['deadlocks'].append(deadlock_results)
+                process_info['deadlock_seq'] = next(_deadlock_seq)
             
-            # Emit real-time updates via WebSocket
-            # Send metric update to general stream
-            socketio.emit('metric_update', {
-                'pid': pid,
-                'metric': metric,
-                'anomaly_detected': anomaly_results['anomalies_detected'] > 0,
-                'deadlock_detected': deadlock_results['has_cycles']
-            })
-            
-            # Send metric update to PID-specific stream
+            # Emit real-time updates via WebSocket: one serialization, delivered
+            # once to PID subscribers and to clients subscribed with pid='all'
             socketio.emit('metric_update', {
                 'pid': pid,
                 'metric': metric,
                 'anomaly_detected': anomaly_results['anomalies_detected'] > 0,
                 'deadlock_detected': deadlock_results['has_cycles']
-            }, room=f'metric_update_{pid}')
+            }, to=[f'metric_update_{pid}', 'metric_update_all'])
+            socketio.emit('metric_update_packed', _pack_metric(metric),
+                          to=[f'metric_update_packed_{pid}', 'metric_update_packed_all'])
             
             # Emit anomaly update if detected
             if anomaly_results['anomalies_detected'] > 0:
@@ -344,7 +622,7 @@ def continuous_profiling(pid):
                     'timestamp': time.time()
                 }, room=f'deadlock_{pid}')
             
-            time.sleep(1)  # Sample every second
+            socketio.sleep(1)  # Sample every second
             
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             # Process ended or is no longer accessible
@@ -353,11 +631,43 @@ def continuous_profiling(pid):
             print(f"Error in continuous profiling for PID {pid}: {e}")
             break
     
+    if sampler is not None:
+        sampler.close()
+    
     # Mark process as no longer running
     if pid in active_profiles:
         active_profiles[pid]['running'] = False
 
 
+@app.route('/api/profile/<int:pid>', methods=['GET'])
+def get_profile_job(pid):
+    """Poll a profiling job started by /api/profile/start (the job id is the PID)."""
+    try:
+        if pid not in active_profiles:
+            return jsonify({'error': 'Profiling job not found'}), 404
+        
+        profile_info = active_profiles[pid]
+        returncode = profile_info['process'].poll()
+        profiling_active = _profiling_active(profile_info)
+        result = {
+            'job_id': pid,
+            'status': 'running' if profiling_active or returncode is None else 'done',
+            'profiling_active': profiling_active,
+            'returncode': returncode
+        }
+        
+        # Program output is only complete once the process has exited
+        if returncode is not None:
+            stdout_file, stderr_file = profile_info.get('output', (None, None))
+            result['stdout'] = _read_job_output(stdout_file)
+            result['stderr'] = _read_job_output(stderr_file)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # PID-scoped profiling endpoint
 @app.route('/api/profile', methods=['GET'])
 def get_profile_status():
@@ -383,12 +693,12 @@ def get_profile_status():
             latest_metrics = []
             if pid in profile_data and profile_data[pid]:
                 # Get last 10 metrics
-                latest_metrics = profile_data[pid][-10:]
+                latest_metrics = _snapshot_samples(pid, 10)
             
             # Count child processes
             child_count = 0
             try:
-                p = psutil.Process(pid)
+                p = _get_process(pid)
                 child_count = len(p.children())
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 pass
@@ -403,6 +713,7 @@ def get_profile_status():
                 'program_path': profile_info['program_path'],
                 'is_running': is_running,
                 'uptime': uptime,
+                'profiling_active': _profiling_active(profile_info),
                 'child_process_count': child_count,
                 'current_phase': latest_metric['phase'] if latest_metric else 'unknown',
                 'latest_metrics': latest_metrics,
@@ -429,11 +740,11 @@ def get_profile_status():
 
                 latest_metrics = []
                 if pid in profile_data and profile_data[pid]:
-                    latest_metrics = profile_data[pid][-10:]
+                    latest_metrics = _snapshot_samples(pid, 10)
 
                 child_count = 0
                 try:
-                    p = psutil.Process(pid)
+                    p = _get_process(pid)
                     child_count = len(p.children())
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
@@ -445,6 +756,7 @@ def get_profile_status():
                     'program_path': profile_info.get('program_path'),
                     'is_running': is_running,
                     'uptime': uptime,
+                    'profiling_active': _profiling_active(profile_info),
                     'child_process_count': child_count,
                     'current_phase': latest_metric['phase'] if latest_metric else 'unknown',
                     'latest_metrics': latest_metrics,
@@ -462,41 +774,83 @@ def get_profile_status():
         return jsonify({'error': str(e)}), 500
 
 
+# Dashboards poll /api/system; a background task rescans the process table
+# once a second while anyone is polling and requests just read its snapshot
+_SYSTEM_SNAPSHOT_INTERVAL = 1.0
+_SYSTEM_SNAPSHOT_IDLE = 30.0  # Stop refreshing after this long without a request
+_system_snapshot = {'payload': None, 'last_read': 0.0, 'task': None}
+_system_snapshot_lock = threading.Lock()
+
+
+def _build_system_context():
+    """System metrics and the top 10 processes by CPU."""
+    # Get overall system metrics
+    # Usage since the previous call (or since startup), without a 1 s block
+    cpu_percent = psutil.cpu_percent(interval=None)
+    memory = psutil.virtual_memory()
+    disk_usage = psutil.disk_usage('/')
+    
+    # Get top system processes
+    processes = []
+    for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+        try:
+            proc_info = proc.info
+            if proc_info['cpu_percent'] is not None and proc_info['memory_percent'] is not None:
+                processes.append(proc_info)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    
+    # Top 10 by CPU usage without sorting the whole process list
+    top_processes = heapq.nlargest(10, processes, key=lambda x: x['cpu_percent'] or 0)
+    
+    return {
+        'status': 'success',
+        'timestamp': time.time(),
+        'system_metrics': {
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory.percent,
+            'memory_used_gb': memory.used / (1024**3),
+            'memory_total_gb': memory.total / (1024**3),
+            'disk_percent': disk_usage.percent,
+            'boot_time': psutil.boot_time()
+        },
+        'top_processes': top_processes
+    }
+
+
+def _refresh_system_snapshot():
+    """Rebuild the /api/system snapshot every interval until polling stops."""
+    while True:
+        socketio.sleep(_SYSTEM_SNAPSHOT_INTERVAL)
+        with _system_snapshot_lock:
+            if time.time() - _system_snapshot['last_read'] > _SYSTEM_SNAPSHOT_IDLE:
+                # Nothing refreshes the snapshot from here on, so drop it and
+                # let the next poll build a fresh one instead of serving it stale
+                _system_snapshot['task'] = None
+                _system_snapshot['payload'] = None
+                return
+        try:
+            _system_snapshot['payload'] = _build_system_context()
+        except Exception as e:
+            print(f"Error refreshing system snapshot: {e}")
+
+
 @app.route('/api/system', methods=['GET'])
 def get_system_context():
     """Get system context information for comparison purposes."""
     try:
-        # Get overall system metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk_usage = psutil.disk_usage('/')
-        
-        # Get top system processes
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                proc_info = proc.info
-                if proc_info['cpu_percent'] is not None and proc_info['memory_percent'] is not None:
-                    processes.append(proc_info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        with _system_snapshot_lock:
+            _system_snapshot['last_read'] = time.time()
+            if _system_snapshot['task'] is None:
+                _system_snapshot['task'] = socketio.start_background_task(_refresh_system_snapshot)
+            payload = _system_snapshot['payload']
         
-        # Sort by CPU usage and get top 10
-        top_processes = sorted(processes, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:10]
+        if payload is None:
+            # First request, or the first after an idle period, before the
+            # refresher's first pass
+            payload = _system_snapshot['payload'] = _build_system_context()
         
-        return jsonify({
-            'status': 'success',
-            'timestamp': time.time(),
-            'system_metrics': {
-                'cpu_percent': cpu_percent,
-                'memory_percent': memory.percent,
-                'memory_used_gb': memory.used / (1024**3),
-                'memory_total_gb': memory.total / (1024**3),
-                'disk_percent': disk_usage.percent,
-                'boot_time': psutil.boot_time()
-            },
-            'top_processes': top_processes
-        })
+        return jsonify(payload)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -513,23 +867,31 @@ def get_metrics():
             if pid not in profile_data:
                 return jsonify({'error': 'No metrics data found for this PID'}), 404
             
-            metrics = profile_data[pid]
-            return jsonify({
+            # Serve one page at a time so response size is bounded by the limit
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = max(0, int(request.args.get('limit', 1000)))
+            samples = profile_data[pid]
+            total = len(samples)
+            metrics = samples.records(offset, offset + limit)
+
+            response = jsonify({
                 'status': 'success',
                 'metrics': metrics,
-                'count': len(metrics)
+                'count': len(metrics),
+                'offset': offset,
+                'total': total
             })
+            if metrics:
+                response.headers['Content-Range'] = f'items {offset}-{offset + len(metrics) - 1}/{total}'
+            else:
+                response.headers['Content-Range'] = f'items */{total}'
+            return response
         else:
-            # If no PID specified, return all metrics
-            all_metrics = {}
-            for p_id, data in profile_data.items():
-                all_metrics[str(p_id)] = data
-            
-            return jsonify({
-                'status': 'success',
-                'metrics': all_metrics,
-                'pids': list(all_metrics.keys())
-            })
+            # If no PID specified, stream all metrics instead of building
+            # the whole document in memory before the first byte goes out
+            pids = list(profile_data.keys())
+            return app.response_class(stream_with_context(_stream_all_metrics(pids)),
+                                      mimetype='application/json')
         
     except ValueError:
         return jsonify({'error': 'Invalid PID format'}), 400
@@ -546,9 +908,9 @@ def get_metrics_for_pid(pid):
         if pid not in profile_data:
             return jsonify({'error': 'No metrics data found for this PID'}), 404
         
-        # Filter metrics by duration
+        # Filter metrics by duration; the store binary-searches its timestamps
         cutoff_time = time.time() - duration
-        recent_metrics = [m for m in profile_data[pid] if m['timestamp'] >= cutoff_time]
+        recent_metrics = profile_data[pid].since(cutoff_time)
         
         return jsonify({
             'status': 'success',
@@ -585,20 +947,16 @@ def get_phases(pid):
                     'memory_percent': random.uniform(10, 80)
                 })
         else:
-            # Filter metrics by duration
+            # Filter metrics by duration; the store binary-searches its timestamps
             cutoff_time = time.time() - duration
-            recent_metrics = [m for m in profile_data[pid] if m['timestamp'] >= cutoff_time]
             
-            # Extract phases
-            phases = []
-            for metric in recent_metrics:
-                phase_info = {
-                    'timestamp': metric.get('timestamp', 0),
-                    'phase': metric.get('phase', 'unknown'),
-                    'cpu_percent': float(metric.get('cpu_percent', 0)),
-                    'memory_percent': float(metric.get('memory_percent', 0))
-                }
-                phases.append(phase_info)
+            # Extract phases; the store holds these as floats already
+            phases = [{
+                'timestamp': metric['timestamp'],
+                'phase': metric['phase'],
+                'cpu_percent': metric['cpu_percent'],
+                'memory_percent': metric['memory_percent']
+            } for metric in profile_data[pid].since(cutoff_time)]
         
         return jsonify({
             'status': 'success',
@@ -610,14 +968,15 @@ def get_phases(pid):
         return jsonify({'error': 'Invalid duration or PID format'}), 400
     except Exception as e:
         # Return sample data even on error
+        now = time.time()
         return jsonify({
             'status': 'success',
             'phases': [
-                {'timestamp': time.time() - 300, 'phase': 'cpu_bound', 'cpu_percent': 75.0, 'memory_percent': 45.0},
-                {'timestamp': time.time() - 240, 'phase': 'io_bound', 'cpu_percent': 30.0, 'memory_percent': 60.0},
-                {'timestamp': time.time() - 180, 'phase': 'memory_bound', 'cpu_percent': 45.0, 'memory_percent': 85.0},
-                {'timestamp': time.time() - 120, 'phase': 'mixed', 'cpu_percent': 65.0, 'memory_percent': 55.0},
-                {'timestamp': time.time() - 60, 'phase': 'idle', 'cpu_percent': 15.0, 'memory_percent': 25.0}
+                {'timestamp': now - 300, 'phase': 'cpu_bound', 'cpu_percent': 75.0, 'memory_percent': 45.0},
+                {'timestamp': now - 240, 'phase': 'io_bound', 'cpu_percent': 30.0, 'memory_percent': 60.0},
+                {'timestamp': now - 180, 'phase': 'memory_bound', 'cpu_percent': 45.0, 'memory_percent': 85.0},
+                {'timestamp': now - 120, 'phase': 'mixed', 'cpu_percent': 65.0, 'memory_percent': 55.0},
+                {'timestamp': now - 60, 'phase': 'idle', 'cpu_percent': 15.0, 'memory_percent': 25.0}
             ],
             'count': 5
         })
@@ -631,90 +990,68 @@ def get_process_tree(pid):
         # Even if not actively profiling, try to get process info
         try:
             # Get the main process
-            main_process = psutil.Process(pid)
+            main_process = _get_process(pid)
             
             # Build the process tree
             def get_process_info(process):
+                # Prefer the latest sampled metrics from profile_data; the
+                # sampler stores plain floats, so no conversion is needed
+                samples = profile_data.get(process.pid)
+                latest = samples.latest() if samples else None
                 try:
-                    # Prefer latest sampled metrics from profile_data if available
-                    pid_local = process.pid
-                    cpu_percent = None
-                    memory_percent = None
-                    memory_info = None
-
-                    if pid_local in profile_data and profile_data[pid_local]:
-                        latest = profile_data[pid_local][-1]
-                        try:
-                            cpu_percent = float(latest.get('cpu_percent', 0))
-                        except:
-                            cpu_percent = 0.0
-                        try:
-                            memory_percent = float(latest.get('memory_percent', 0))
-                        except:
-                            memory_percent = 0.0
-                        # memory_rss_mb may be stored as memory_used_mb in profile_data
-                        memory_info = None
-                    else:
-                        # Fallback to live psutil snapshot with interval parameter
-                        cpu_percent = process.cpu_percent(interval=0.05)
-                        memory_percent = process.memory_percent()
-                        memory_info = process.memory_info()
-                    
-                    # Get current phase from stored metrics if available
-                    current_phase = 'unknown'
-                    if pid_local in profile_data and profile_data[pid_local]:
-                        latest_metric = profile_data[pid_local][-1]
-                        if latest_metric:
-                            current_phase = latest_metric.get('phase', 'unknown')
-                            # If memory_info wasn't set above, try to derive RSS
-                            if memory_info is None:
-                                # try memory_used_mb field
-                                mem_mb = latest_metric.get('memory_used_mb') or latest_metric.get('memory_rss_mb') or latest_metric.get('memory_used_gb')
-                                if mem_mb is not None:
-                                    try:
-                                        # convert GB to MB if necessary
-                                        mem_val = float(mem_mb)
-                                        if mem_val < 10:
-                                            # likely GB -> convert to MB for consistency
-                                            memory_rss_mb = mem_val * 1024
-                                        else:
-                                            memory_rss_mb = mem_val
-                                    except:
-                                        memory_rss_mb = 0.0
-                    else:
-                        # Default to CPU-bound if no data
-                        current_phase = 'cpu_bound' if cpu_percent > 70 else 'idle'
-                    
-                    return {
-                        'pid': process.pid,
-                        'name': process.name(),
-                        'status': process.status(),
-                        'cpu_percent': cpu_percent if cpu_percent is not None else 0.0,
-                        'memory_percent': memory_percent if memory_percent is not None else 0.0,
-                        'memory_rss_mb': (memory_info.rss / (1024**2)) if memory_info is not None else (memory_rss_mb if 'memory_rss_mb' in locals() and memory_rss_mb is not None else 0.0),
-                        'current_phase': current_phase,
-                        'num_threads': process.num_threads(),
-                        'children': []
-                    }
+                    with process.oneshot():
+                        if latest:
+                            cpu_percent = latest.get('cpu_percent') or 0.0
+                            memory_percent = latest.get('memory_percent') or 0.0
+                            current_phase = latest.get('phase', 'unknown')
+                            if latest.get('memory_used_gb') is not None and latest.get('memory_used_mb') is None:
+                                memory_rss_mb = latest['memory_used_gb'] * 1024
+                            else:
+                                memory_rss_mb = latest.get('memory_used_mb') or latest.get('memory_rss_mb') or 0.0
+                        else:
+                            # Fallback to a live psutil snapshot
+                            cpu_percent = _process_cpu_percent(process)
+                            memory_percent = process.memory_percent()
+                            memory_rss_mb = process.memory_info().rss / (1024**2)
+                            # Default to CPU-bound if no data
+                            current_phase = 'cpu_bound' if cpu_percent > 70 else 'idle'
+                        
+                        return {
+                            'pid': process.pid,
+                            'name': process.name(),
+                            'status': process.status(),
+                            'cpu_percent': cpu_percent,
+                            'memory_percent': memory_percent,
+                            'memory_rss_mb': memory_rss_mb,
+                            'current_phase': current_phase,
+                            'num_threads': process.num_threads(),
+                            'children': []
+                        }
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     return None
             
             def build_tree(process):
-                proc_info = get_process_info(process)
-                if not proc_info:
+                tree = get_process_info(process)
+                if not tree:
                     return None
                 
-                # Recursively get children
-                try:
-                    children = process.children(recursive=False)
-                    for child in children:
-                        child_node = build_tree(child)
+                # One scan of the process table gives every parent -> children
+                # edge; walk the subtree from it instead of asking each node
+                # for its children (each ask is another full scan)
+                children_by_ppid = _children_index()
+                pending = deque([(process.pid, tree)])
+                while pending:
+                    parent_pid, parent_node = pending.popleft()
+                    for child_pid in children_by_ppid.get(parent_pid, ()):
+                        try:
+                            child_node = get_process_info(_get_process(child_pid))
+                        except (psutil.NoSuchProcess, psutil.AccessDenied):
+                            continue
                         if child_node:
-                            proc_info['children'].append(child_node)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
+                            parent_node['children'].append(child_node)
+                            pending.append((child_pid, child_node))
                 
-                return proc_info
+                return tree
             
             tree = build_tree(main_process)
             
@@ -724,7 +1061,7 @@ def get_process_tree(pid):
                     'pid': pid,
                     'name': main_process.name(),
                     'status': main_process.status(),
-                    'cpu_percent': main_process.cpu_percent(interval=0.05),
+                    'cpu_percent': _process_cpu_percent(main_process),
                     'memory_percent': main_process.memory_percent(),
                     'memory_rss_mb': main_process.memory_info().rss / (1024**2),
                     'current_phase': 'unknown',
@@ -747,7 +1084,7 @@ def get_process_tree(pid):
         # Return basic process info even if detailed analysis fails
         try:
             pid = request.view_args['pid']
-            process = psutil.Process(pid)
+            process = _get_process(pid)
             return jsonify({
                 'status': 'success',
                 'pid': pid,
@@ -767,42 +1104,44 @@ def get_process_tree(pid):
             return jsonify({'error': str(e)}), 500
 
 
+# Columns classify_bottlenecks reads, in matrix order
+_BOTTLENECK_COLUMNS = ('cpu_percent', 'memory_percent', 'disk_read_mb', 'disk_write_mb')
+
+
 @app.route('/api/classify', methods=['POST'])
 def classify_bottlenecks():
     """Classify bottlenecks using rule-based logic (no ML model required)."""
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         metrics = data.get('metrics', [])
         
-        if not metrics:
-            # Try to get from CSV if no metrics provided
-            csv_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
-            if os.path.exists(csv_file):
-                with open(csv_file, 'r') as f:
-                    reader = csv.DictReader(f)
-                    metrics = list(reader)
+        # Use rule-based classification from phaseprofiler over whole columns
+        if metrics:
+            # Gathered in one pass; NumPy converts the values in C
+            columns = np.array([(m.get('cpu_percent', 0), m.get('memory_percent', 0),
+                                 m.get('disk_read_mb', 0), m.get('disk_write_mb', 0)) for m in metrics],
+                               dtype=np.float64).reshape(-1, 4)
+        else:
+            # Try to get from CSV if no metrics provided; pandas parses the
+            # numeric columns directly, without building per-row dicts
+            columns = _read_training_columns(_BOTTLENECK_COLUMNS)
         
-        if not metrics:
+        if columns is None or not len(columns):
             return jsonify({'error': 'No metrics provided'}), 400
         
-        # Use rule-based classification from phaseprofiler
-        profiler = PhasProfiler()
-        classifications = []
+        cpu, memory = columns[:, 0], columns[:, 1]
+        io_rate = columns[:, 2] + columns[:, 3]
+        phase_ids = phase_profiler.detect_phase_ids(cpu, memory, io_rate)
         
-        for metric in metrics:
-            cpu = float(metric.get('cpu_percent', 0))
-            memory = float(metric.get('memory_percent', 0))
-            disk_read = float(metric.get('disk_read_mb', 0))
-            disk_write = float(metric.get('disk_write_mb', 0))
-            io_rate = disk_read + disk_write
-            
-            phase = profiler.detect_phase(cpu, memory, io_rate)
-            classifications.append({
-                'phase': phase,
-                'cpu_percent': cpu,
-                'memory_percent': memory,
-                'io_rate': io_rate
-            })
+        labels = PhasProfiler.PHASES
+        classifications = [{
+            'phase': labels[phase_id],
+            'cpu_percent': c,
+            'memory_percent': mem,
+            'io_rate': io
+        } for phase_id, c, mem, io in zip(phase_ids.tolist(), cpu.tolist(), memory.tolist(), io_rate.tolist())]
         
         return jsonify({
             'status': 'success',
@@ -821,21 +1160,59 @@ def profile_bottleneck(pid):
         if pid not in profile_data or not profile_data[pid]:
             return jsonify({'status': 'success', 'bottlenecks': [], 'message': 'No metrics available for this PID'}), 200
 
-        metrics = profile_data[pid]
+        metrics = _snapshot_samples(pid)
+        # Class probabilities cost nothing extra (the label is derived from
+        # them) but are only attached when the caller asks for them
+        return_proba = request.args.get('proba', '0') == '1'
 
-        if bottleneck_classifier is None:
-            # Fallback: simple heuristic
-            from bottleneck_classifier import BottleneckClassifier as _BC
-            bc = _BC()
-            results = bc.classify(metrics)
-        else:
-            results = bottleneck_classifier.classify(metrics)
+        results = _get_bottleneck_classifier().classify(metrics, return_proba=return_proba)
 
         return jsonify({'status': 'success', 'pid': pid, 'bottlenecks': results})
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
 
+# path -> ((mtime_ns, size), parsed report) for simulator deadlock reports
+_deadlock_report_cache = {}
+
+
+def _read_json_file(path):
+    """Parse a JSON file with orjson."""
+    with open(path, 'rb') as fh:
+        return orjson.loads(fh.read())
+
+
+# pid -> (deadlock_seq, nodes, edges) for get_waitfor_graph; entries are
+# dropped when the session is stopped
+_waitfor_cache = {}
+# Stamped on a session each time it records a deadlock; never reused, so a
+# cached graph cannot match a later session on a recycled PID
+_deadlock_seq = itertools.count(1)
+
+
+def _cycle_graph(deadlocks):
+    """Nodes and deduplicated edges of every cycle in a PID's deadlock history."""
+    nodes = []
+    edges = []
+    # Sets for O(1) dedupe; the lists keep first-seen order for output
+    node_set = set()
+    edge_set = set()
+    for d in deadlocks:
+        cycles = d.get('cycles') or []
+        for cycle in cycles:
+            # cycle is list of nodes
+            for n in cycle:
+                if n not in node_set:
+                    node_set.add(n)
+                    nodes.append(n)
+            for i in range(len(cycle)):
+                key = (cycle[i], cycle[(i + 1) % len(cycle)])
+                if key not in edge_set:
+                    edge_set.add(key)
+                    edges.append({'source': key[0], 'target': key[1]})
+    return nodes, edges
+
+
 @app.route('/api/profile/<int:pid>/waitfor', methods=['GET'])
 def get_waitfor_graph(pid):
     """Return a simple wait-for graph structure (nodes, edges) for visualization."""
@@ -843,27 +1220,24 @@ def get_waitfor_graph(pid):
         nodes = []
         edges = []
 
-        # If historical deadlock cycles exist, derive graph from them
+        # If historical deadlock cycles exist, derive graph from them. The
+        # history is append-only and deadlock_seq changes on every append,
+        # so repeated polls reuse the graph built for it.
         if pid in active_profiles and active_profiles[pid].get('deadlocks'):
-            deadlocks = active_profiles[pid].get('deadlocks', [])
-            for d in deadlocks:
-                cycles = d.get('cycles') or d.get('cycles', [])
-                for cycle in cycles:
-                    # cycle is list of nodes
-                    for n in cycle:
-                        if n not in nodes:
-                            nodes.append(n)
-                    for i in range(len(cycle)):
-                        a = cycle[i]
-                        b = cycle[(i + 1) % len(cycle)]
-                        edges.append({'source': a, 'target': b})
+            deadlocks = active_profiles[pid]['deadlocks']
+            key = active_profiles[pid].get('deadlock_seq')
+            cached = _waitfor_cache.get(pid)
+            if cached is None or cached[0] != key:
+                cached = (key, *_cycle_graph(deadlocks))
+                _waitfor_cache[pid] = cached
+            # Copies, so the process-tree fallback below never mutates the cache
+            nodes = list(cached[1])
+            edges = list(cached[2])
 
         # If no deadlocks, create lightweight graph from process tree
         if not nodes:
             try:
-                p = None
-                import psutil
-                p = psutil.Process(pid)
+                p = _get_process(pid)
                 nodes.append({'id': pid, 'label': p.name()})
                 # add children as nodes
                 for child in p.children(recursive=False):
@@ -892,23 +1266,21 @@ def profile_threat_classify(pid):
                 'alerts': []
             })
 
-        latest_metrics = profile_data[pid][-20:]  # last 20 samples
+        latest_metrics = _snapshot_samples(pid, 20)  # last 20 samples
 
         # Use existing anomaly_detector instance
-        results = anomaly_detector.detect_anomalies(latest_metrics)
+        results = anomaly_batcher.detect(latest_metrics)
 
         # Interpret prediction
         anomalies_detected = results.get('anomalies_detected', 0)
         total_samples = results.get('total_samples') or len(latest_metrics) or 1
         predicted = 'anomalous' if anomalies_detected > 0 else 'normal'
 
-        # Compute anomaly score as proportion of anomalous samples
-        try:
-            anomaly_score = float(anomalies_detected) / float(total_samples)
-        except Exception:
-            anomaly_score = 0.0
-
-        anomaly_score_normalized = min(1.0, max(0.0, anomaly_score))
+        # Compute anomaly score as proportion of anomalous samples. total_samples
+        # is at least 1; the rule-based path counts every rule a sample trips,
+        # so only the upper bound needs clamping
+        anomaly_score = anomalies_detected / total_samples
+        anomaly_score_normalized = min(1.0, anomaly_score)
 
         return jsonify({
             'status': 'success', 
@@ -927,13 +1299,11 @@ def profile_threat_classify(pid):
 def detect_deadlock_legacy():
     """Legacy deadlock detection endpoint (non-PID scoped)."""
     try:
-        detector = DeadlockDetector()
-        
         # Run deadlock analysis
-        analysis = detector.analyze_deadlock_risk()
+        analysis = deadlock_detector.analyze_deadlock_risk()
         
         # Save lock logs
-        detector.save_lock_logs()
+        deadlock_detector.save_lock_logs()
         
         return jsonify({
             'status': 'success',
@@ -951,38 +1321,40 @@ def detect_deadlock(pid):
         
         # If a simulator has produced a deadlock report file for this PID, return it
         report_path = os.path.join(os.path.dirname(__file__), 'data', 'deadlocks', f'{pid}_deadlock.json')
-        if os.path.exists(report_path):
+        # Parsed once per file version, so polls of an unchanged report skip the decode
+        try:
+            rpt = _per_file_cached(_deadlock_report_cache, report_path, _read_json_file)
+        except (OSError, ValueError):
+            rpt = None
+        if rpt is not None:
             try:
-                with open(report_path, 'r') as fh:
-                    rpt = json.load(fh)
-                    analysis = rpt.get('analysis', {})
-                    # Build enhanced analysis payload including graph when available
-                    enhanced_analysis = {
-                        'has_cycles': analysis.get('has_cycles', False),
-                        'cycle_count': analysis.get('cycle_count', 0),
-                        'risk_level': analysis.get('risk_level', 'high' if analysis.get('has_cycles') else 'low'),
-                        'nodes_in_cycles': analysis.get('nodes_in_cycles', []),
-                        'total_locks_tracked': analysis.get('total_locks_tracked', 0),
-                        'timestamp': analysis.get('timestamp', time.time()),
-                        'process_pid': analysis.get('process_pid', pid),
-                        'graph': analysis.get('graph')
-                    }
-                    historical_deadlocks = []
-                    if pid in active_profiles:
-                        historical_deadlocks = active_profiles[pid].get('deadlocks', [])
-                    return jsonify({
-                        'status': 'success',
-                        'analysis': enhanced_analysis,
-                        'graph': enhanced_analysis.get('graph'),
-                        'historical_deadlocks': historical_deadlocks,
-                        'pid': pid
-                    })
+                analysis = rpt.get('analysis', {})
+                # Build enhanced analysis payload including graph when available
+                enhanced_analysis = {
+                    'has_cycles': analysis.get('has_cycles', False),
+                    'cycle_count': analysis.get('cycle_count', 0),
+                    'risk_level': analysis.get('risk_level', 'high' if analysis.get('has_cycles') else 'low'),
+                    'nodes_in_cycles': analysis.get('nodes_in_cycles', []),
+                    'total_locks_tracked': analysis.get('total_locks_tracked', 0),
+                    'timestamp': analysis.get('timestamp', time.time()),
+                    'process_pid': analysis.get('process_pid', pid),
+                    'graph': analysis.get('graph')
+                }
+                historical_deadlocks = []
+                if pid in active_profiles:
+                    historical_deadlocks = active_profiles[pid].get('deadlocks', [])
+                return jsonify({
+                    'status': 'success',
+                    'analysis': enhanced_analysis,
+                    'graph': enhanced_analysis.get('graph'),
+                    'historical_deadlocks': historical_deadlocks,
+                    'pid': pid
+                })
             except Exception:
                 pass
 
         # Always run fresh deadlock analysis with PID context
-        detector = DeadlockDetector()
-        fresh_analysis = detector.analyze_deadlock_risk(pid=pid)
+        fresh_analysis = deadlock_detector.analyze_deadlock_risk(pid=pid)
         
         # Get historical deadlock data if available
         historical_deadlocks = []
@@ -1034,7 +1406,9 @@ def detect_deadlock(pid):
 def detect_anomalies():
     """Detect security anomalies."""
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         metrics = data.get('metrics', [])
         pid = data.get('pid', None)
         
@@ -1044,26 +1418,26 @@ def detect_anomalies():
         
         # Fallback to CSV if still no metrics
         if not metrics:
-            csv_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
-            if os.path.exists(csv_file):
-                with open(csv_file, 'r') as f:
-                    reader = csv.DictReader(f)
-                    metrics = list(reader)
-        
+            metrics = _read_training_metrics()
+
         # Generate sample data if nothing available
         if not metrics:
+            sample_time = datetime.now().isoformat()
             metrics = [
                 {'cpu_percent': 25.0, 'memory_percent': 45.0, 'memory_used_gb': 2.3,
-                 'disk_read_mb': 15.0, 'disk_write_mb': 8.0, 'timestamp': datetime.now().isoformat()},
+                 'disk_read_mb': 15.0, 'disk_write_mb': 8.0, 'timestamp': sample_time},
                 {'cpu_percent': 85.0, 'memory_percent': 65.0, 'memory_used_gb': 3.1,
-                 'disk_read_mb': 25.0, 'disk_write_mb': 12.0, 'timestamp': datetime.now().isoformat()},
+                 'disk_read_mb': 25.0, 'disk_write_mb': 12.0, 'timestamp': sample_time},
                 {'cpu_percent': 95.0, 'memory_percent': 88.0, 'memory_used_gb': 6.8,
-                 'disk_read_mb': 5.0, 'disk_write_mb': 3.0, 'timestamp': datetime.now().isoformat()}
+                 'disk_read_mb': 5.0, 'disk_write_mb': 3.0, 'timestamp': sample_time}
             ]
         
         # Use anomaly detector
-        results = anomaly_detector.detect_anomalies(metrics)
+        results = anomaly_batcher.detect(metrics)
         
+        alerts = results.get('alerts', [])
+        severity_counts = Counter(a.get('severity') for a in alerts)
+
         # Enhance results with additional context
         enhanced_results = {
             'status': 'success',
@@ -1072,15 +1446,15 @@ def detect_anomalies():
             'model_used': 'ML Model' if anomaly_detector.model_loaded else 'Rule-Based',
             'results': results,
             'summary': {
-                'total_alerts': len(results.get('alerts', [])),
-                'high_severity': len([a for a in results.get('alerts', []) if a.get('severity') == 'HIGH']),
-                'medium_severity': len([a for a in results.get('alerts', []) if a.get('severity') == 'MEDIUM']),
-                'low_severity': len([a for a in results.get('alerts', []) if a.get('severity') == 'LOW'])
+                'total_alerts': len(alerts),
+                'high_severity': severity_counts['HIGH'],
+                'medium_severity': severity_counts['MEDIUM'],
+                'low_severity': severity_counts['LOW']
             },
             'detection_parameters': {
-                'cpu_threshold': 95,
-                'memory_threshold': 90,
-                'io_threshold_mb': 1000
+                'cpu_threshold': CPU_THRESHOLD,
+                'memory_threshold': MEMORY_THRESHOLD,
+                'io_threshold_mb': IO_THRESHOLD_MB
             }
         }
         
@@ -1128,6 +1502,11 @@ def get_anomaly_timeline(pid):
         return jsonify({'error': str(e)}), 500
 
 
+# Risk score contribution of a stored anomaly, by its severity (or warning type)
+_ANOMALY_SEVERITY_WEIGHTS = {'high': 10, 'medium': 5}
+_ANOMALY_WARNING_WEIGHT = 3
+
+
 @app.route('/api/profile/<int:pid>/anomaly/alerts', methods=['GET'])
 def get_anomaly_alerts(pid):
     """Get anomaly alerts for a specific PID."""
@@ -1139,20 +1518,12 @@ def get_anomaly_alerts(pid):
         profile_info = active_profiles[pid]
         anomalies = profile_info.get('anomalies', [])
         
-        # Calculate anomaly risk score
-        risk_score = 0
-        threat_count = 0
-        for anomaly in anomalies:
-            if 'severity' in anomaly:
-                if anomaly['severity'] == 'high':
-                    risk_score += 10
-                    threat_count += 1
-                elif anomaly['severity'] == 'medium':
-                    risk_score += 5
-                    threat_count += 1
-            elif 'type' in anomaly and anomaly['type'] == 'warning':
-                risk_score += 3
-                threat_count += 1
+        # Calculate anomaly risk score; anything without a weight is not a threat
+        weights = [_ANOMALY_SEVERITY_WEIGHTS.get(a['severity'], 0) if 'severity' in a
+                   else _ANOMALY_WARNING_WEIGHT if a.get('type') == 'warning' else 0
+                   for a in anomalies]
+        risk_score = sum(weights)
+        threat_count = len(weights) - weights.count(0)
         
         return jsonify({
             'status': 'success',
@@ -1173,7 +1544,9 @@ def get_anomaly_alerts(pid):
 def take_alert_action(pid, alert_id):
     """Take action on a specific anomaly alert."""
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         action = data.get('action', 'acknowledge')
         
         if pid not in active_profiles:
@@ -1199,23 +1572,21 @@ def take_alert_action(pid, alert_id):
 def get_recommendations_legacy():
     """Legacy recommendations endpoint (non-PID scoped)."""
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         metrics = data.get('metrics', [])
         phase_type = data.get('phase_type')
         
         if not metrics:
             # Try to get from CSV if no metrics provided
-            csv_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
-            if os.path.exists(csv_file):
-                with open(csv_file, 'r') as f:
-                    reader = csv.DictReader(f)
-                    metrics = list(reader)
+            metrics = _read_training_metrics()
         
         if not metrics:
             return jsonify({'error': 'No metrics provided'}), 400
         
         # Use recommender
-        results = recommender.get_recommendations(metrics, phase_type)
+        results = _cached_recommendations(metrics, phase_type)
         
         return jsonify({
             'status': 'success',
@@ -1235,10 +1606,10 @@ def get_optimization_recommendations(pid):
         
         # Get the latest metrics for this PID
         if pid in profile_data and profile_data[pid]:
-            latest_metrics = profile_data[pid][-10:]  # Last 10 metrics
+            latest_metrics = _snapshot_samples(pid, 10)  # Last 10 metrics
             
             # Use the recommender to get recommendations
-            results = recommender.get_recommendations(latest_metrics)
+            results = _cached_recommendations(latest_metrics)
         else:
             # If no metrics available, return empty recommendations
             results = {
@@ -1269,14 +1640,16 @@ def get_optimization_recommendations(pid):
 def predict_speedup():
     """Predict optimization speedup using regression model."""
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         metrics = data.get('metrics', [])
         
         if not metrics:
             return jsonify({'error': 'No metrics provided'}), 400
         
         # Use recommender to get speedup predictions
-        results = recommender.get_recommendations(metrics)
+        results = _cached_recommendations(metrics)
         
         if 'error' in results:
             return jsonify({
@@ -1306,7 +1679,9 @@ def collect_user_data():
     Accepts metrics data and saves it with user identifier.
     """
     try:
-        data = request.get_json()
+        data = _json_body()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
         metrics = data.get('metrics', [])
         user_id = data.get('user_id', 'anonymous')
         source = data.get('source', 'external')  # 'external', 'simulation', 'web'
@@ -1316,36 +1691,43 @@ def collect_user_data():
             return jsonify({'error': 'No metrics data provided'}), 400
         
         # Create user-specific data directory
-        user_data_dir = os.path.join(UPLOAD_FOLDER, 'user_data')
+        user_data_dir = USER_DATA_DIR
         os.makedirs(user_data_dir, exist_ok=True)
         
         # Save user-specific data file
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        now = datetime.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S')
         user_file = os.path.join(user_data_dir, f'{user_id}_{source}_{timestamp}.csv')
         
         # Write metrics to CSV
         if metrics:
-            fieldnames = list(metrics[0].keys())
-            # Add metadata columns if not present
-            if 'user_id' not in fieldnames:
-                fieldnames.append('user_id')
-            if 'source' not in fieldnames:
-                fieldnames.append('source')
-            if 'label' not in fieldnames:
-                fieldnames.append('label')
-            if 'collection_timestamp' not in fieldnames:
-                fieldnames.append('collection_timestamp')
+            # Metric columns first, then any metadata columns not already present
+            fieldnames = list(dict.fromkeys([*metrics[0].keys(), 'user_id', 'source', 'label', 'collection_timestamp']))
+            # One timestamp for the whole batch
+            metadata = {
+                'user_id': user_id,
+                'source': source,
+                'label': label,
+                'collection_timestamp': now.isoformat()
+            }
+            
+            # Rows are built as lists in header order; metadata values are
+            # constant, so in the usual layout (metadata columns last) they
+            # are one shared tail instead of per-row dict entries
+            base_fields = [field for field in fieldnames if field not in metadata]
+            if fieldnames[:len(base_fields)] == base_fields:
+                tail = [metadata[field] for field in fieldnames[len(base_fields):]]
+                rows = ([metric.get(field, '') for field in base_fields] + tail for metric in metrics)
+            else:
+                rows = ([metadata[field] if field in metadata else metric.get(field, '') for field in fieldnames]
+                        for metric in metrics)
             
-            with open(user_file, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for metric in metrics:
-                    row = dict(metric)
-                    row['user_id'] = user_id
-                    row['source'] = source
-                    row['label'] = label
-                    row['collection_timestamp'] = datetime.now().isoformat()
-                    writer.writerow(row)
+            # writerows() formats every row in C; the 1 MiB buffer turns the
+            # upload into a handful of write() calls
+            with open(user_file, 'w', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f)
+                writer.writerow(fieldnames)
+                writer.writerows(rows)
         
         # Optionally merge into main training_data.csv
         merge_to_training = data.get('merge_to_training', False)
@@ -1364,47 +1746,146 @@ def collect_user_data():
         return jsonify({'error': str(e)}), 500
 
 
+def _append_csv_rows(main_file, paths, headers, fieldnames, chunk_size=1 << 20):
+    """
+    Append the data rows of CSV files to main_file without rewriting it.
+    Files whose header equals fieldnames are copied as raw bytes; others are
+    streamed through csv.reader with their columns mapped onto fieldnames
+    (missing columns blank). Every header must be a subset of fieldnames.
+    """
+    # Keep rows on separate lines if the existing file lacks a final newline;
+    # appended data is always terminated, so a compressed file written here
+    # never needs this check
+    needs_newline = False
+    if not main_file.endswith('.gz') and os.path.getsize(main_file):
+        with open(main_file, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b'\n', b'\r')
+    
+    with open_data_file(main_file, 'ab') as dst:
+        if needs_newline:
+            dst.write(b'\r\n')
+        position = {field: i for i, field in enumerate(fieldnames)}
+        width = len(fieldnames)
+        for path in paths:
+            if headers[path] != fieldnames:
+                # Text layer over the open handle; detach() leaves it open
+                out = io.TextIOWrapper(dst, newline='', write_through=True)
+                writer = csv.writer(out)
+                targets = [position[field] for field in headers[path]]
+                with open_data_file(path) as f:
+                    reader = csv.reader(f)
+                    next(reader, None)  # header
+                    for row in reader:
+                        if not row:
+                            continue  # blank line, skipped like DictReader does
+                        out_row = [''] * width
+                        for i, value in zip(targets, row):
+                            out_row[i] = value
+                        writer.writerow(out_row)
+                out.detach()
+                continue
+            last = b'\n'
+            with open(path, 'rb') as src:
+                src.readline()  # header
+                for chunk in iter(lambda: src.read(chunk_size), b''):
+                    dst.write(chunk)
+                    last = chunk[-1:]
+            if last not in (b'\n', b'\r'):
+                dst.write(b'\r\n')
+
+
+def merge_user_files_to_training(user_files):
+    """
+    Append user data files to training_data.csv in a single pass.
+
+    Headers are read first. When the user files bring no columns the training
+    file lacks, their rows are appended to it: as raw bytes for files with
+    exactly its header, remapped by column otherwise. Only new columns (or a
+    storage format switch) make it build the union of columns and stream
+    every row once into a temp file that atomically replaces
+    training_data.csv.
+
+    Returns:
+        tuple: (files merged, total rows in the merged training data)
+    """
+    main_file = _training_data_file()
+    sources = [main_file] if os.path.exists(main_file) else []
+    # Switching storage format forces a rewrite into the new file
+    target_file = TRAINING_CSV_GZ if app.config.get('COMPRESS_TRAINING_DATA') else TRAINING_CSV
+    if not sources:
+        main_file = target_file
+    
+    fieldnames = []
+    main_header = []
+    headers = {}
+    merged_files = []
+    for path in sources + list(user_files):
+        try:
+            header = csv_header(path)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        if path == main_file:
+            main_header = header
+        else:
+            merged_files.append(path)
+            headers[path] = header
+        fieldnames.extend(field for field in header if field not in fieldnames)
+    
+    if not merged_files:
+        return 0, None
+    
+    if main_header and fieldnames == main_header and target_file == main_file:
+        # Common case: the header stays as it is, so only new rows are written
+        _append_csv_rows(main_file, merged_files, headers, fieldnames)
+        print(f"Appended {len(merged_files)} user data files to {main_file}")
+        return len(merged_files), _count_csv_rows(main_file)
+    
+    total_rows = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_file), suffix='.tmp.csv.gz' if target_file.endswith('.gz') else '.tmp.csv')
+    os.close(fd)
+    try:
+        with open_data_file(tmp_path, 'w') as out:
+            writer = csv.writer(out)
+            writer.writerow(fieldnames)
+            position = {field: i for i, field in enumerate(fieldnames)}
+            width = len(fieldnames)
+            for path in sources + merged_files:
+                with open_data_file(path) as f:
+                    reader = csv.reader(f)
+                    header = next(reader, [])
+                    # Map source columns to output positions once per file;
+                    # rows are then placed by index without building dicts
+                    targets = [position[field] for field in header]
+                    same_layout = targets == list(range(width))
+                    for row in reader:
+                        if not row:
+                            continue  # blank line, skipped like DictReader does
+                        if same_layout and len(row) == width:
+                            writer.writerow(row)
+                        else:
+                            # Missing columns are written blank, extra values dropped
+                            out_row = [''] * width
+                            for i, value in zip(targets, row):
+                                out_row[i] = value
+                            writer.writerow(out_row)
+                        total_rows += 1
+        os.replace(tmp_path, target_file)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    if main_file != target_file and os.path.exists(main_file):
+        os.remove(main_file)
+    
+    print(f"Merged {len(merged_files)} user data files into {target_file}")
+    return len(merged_files), total_rows
+
+
 def merge_user_data_to_training(user_file):
     """Merge user-specific data file into main training_data.csv."""
     try:
-        main_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
-        
-        # Read user data
-        user_metrics = []
-        with open(user_file, 'r') as f:
-            reader = csv.DictReader(f)
-            user_metrics = list(reader)
-        
-        if not user_metrics:
-            return
-        
-        # Read existing training data if it exists
-        existing_metrics = []
-        fieldnames = list(user_metrics[0].keys())
-        
-        if os.path.exists(main_file):
-            with open(main_file, 'r') as f:
-                reader = csv.DictReader(f)
-                existing_metrics = list(reader)
-                # Ensure fieldnames match
-                if existing_metrics:
-                    existing_fieldnames = list(existing_metrics[0].keys())
-                    fieldnames = list(set(fieldnames + existing_fieldnames))
-        
-        # Merge data
-        all_metrics = existing_metrics + user_metrics
-        
-        # Write merged data
-        with open(main_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for metric in all_metrics:
-                # Ensure all fields are present
-                row = {field: metric.get(field, '') for field in fieldnames}
-                writer.writerow(row)
-        
-        print(f"Merged {len(user_metrics)} samples from {user_file} into {main_file}")
-        
+        merge_user_files_to_training([user_file])
     except Exception as e:
         print(f"Error merging user data: {e}")
 
@@ -1416,7 +1897,7 @@ def merge_all_user_data():
     Useful for consolidating data from multiple users before training.
     """
     try:
-        user_data_dir = os.path.join(UPLOAD_FOLDER, 'user_data')
+        user_data_dir = USER_DATA_DIR
         
         if not os.path.exists(user_data_dir):
             return jsonify({
@@ -1426,8 +1907,7 @@ def merge_all_user_data():
             })
         
         # Find all user data CSV files
-        import glob
-        user_files = glob.glob(os.path.join(user_data_dir, '*.csv'))
+        user_files = [entry.path for entry in _user_csv_entries(user_data_dir)]
         
         if not user_files:
             return jsonify({
@@ -1436,21 +1916,11 @@ def merge_all_user_data():
                 'merged_files': 0
             })
         
-        merged_count = 0
-        for user_file in user_files:
-            try:
-                merge_user_data_to_training(user_file)
-                merged_count += 1
-            except Exception as e:
-                print(f"Error merging {user_file}: {e}")
-        
-        # Get final count
-        main_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
-        total_samples = 0
-        if os.path.exists(main_file):
-            with open(main_file, 'r') as f:
-                reader = csv.DictReader(f)
-                total_samples = len(list(reader))
+        # One read of every file and one rewrite of training_data.csv,
+        # instead of re-reading and rewriting it once per user file
+        merged_count, total_samples = merge_user_files_to_training(user_files)
+        if total_samples is None:
+            total_samples = len(_read_training_metrics())
         
         return jsonify({
             'status': 'success',
@@ -1463,12 +1933,68 @@ def merge_all_user_data():
         return jsonify({'error': str(e)}), 500
 
 
+def _user_csv_entries(directory):
+    """Sorted DirEntry objects for the visible *.csv files in a directory (one scandir pass)."""
+    with os.scandir(directory) as it:
+        entries = [entry for entry in it
+                   if entry.name.endswith('.csv') and not entry.name.startswith('.') and entry.is_file()]
+    return sorted(entries, key=lambda entry: entry.name)
+
+
+# path -> ((mtime_ns, size), value); entries are recomputed when the file changes
+_csv_row_count_cache = {}
+_csv_first_row_cache = {}
+
+
+def _per_file_cached(cache, path, compute):
+    """compute(path), reused until the file's mtime or size changes."""
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    value = compute(path)
+    cache[path] = (key, value)
+    return value
+
+
+def _count_csv_rows(path):
+    """Data rows in a CSV, recounted only when the file changes."""
+    return _per_file_cached(_csv_row_count_cache, path, count_csv_rows)
+
+
+def _read_first_csv_row(path):
+    """Parse only the header and first data row of a CSV (None if no rows)."""
+    with open(path, 'r', newline='') as f:
+        return next(csv.DictReader(f), None)
+
+
+def _first_csv_row(path):
+    """First data row of a CSV as a dict, re-read only when the file changes."""
+    return _per_file_cached(_csv_first_row_cache, path, _read_first_csv_row)
+
+
+_user_data_stats_cache = {'key': None, 'value': None}
+
+
 @app.route('/api/user-data-stats', methods=['GET'])
 def get_user_data_stats():
     """Get statistics about collected user data."""
     try:
-        user_data_dir = os.path.join(UPLOAD_FOLDER, 'user_data')
-        main_file = os.path.join(UPLOAD_FOLDER, 'training_data.csv')
+        user_data_dir = USER_DATA_DIR
+        main_file = _training_data_file()
+        
+        entries = _user_csv_entries(user_data_dir) if os.path.exists(user_data_dir) else []
+        user_files = [entry.path for entry in entries]
+        
+        # Stats only change when a file is added, removed or rewritten
+        cache_key = (tuple((entry.path, entry.stat().st_mtime) for entry in entries),
+                     os.path.getmtime(main_file) if os.path.exists(main_file) else None)
+        if _user_data_stats_cache['key'] == cache_key:
+            return jsonify({
+                'status': 'success',
+                'stats': _user_data_stats_cache['value']
+            })
         
         stats = {
             'user_files': 0,
@@ -1479,32 +2005,30 @@ def get_user_data_stats():
         
         # Count user files
         if os.path.exists(user_data_dir):
-            import glob
-            user_files = glob.glob(os.path.join(user_data_dir, '*.csv'))
             stats['user_files'] = len(user_files)
             
             # Count samples per user
             for user_file in user_files:
                 try:
-                    with open(user_file, 'r') as f:
-                        reader = csv.DictReader(f)
-                        samples = list(reader)
-                        stats['total_user_samples'] += len(samples)
-                        
-                        # Count by user_id
-                        if samples:
-                            user_id = samples[0].get('user_id', 'unknown')
-                            if user_id not in stats['users']:
-                                stats['users'][user_id] = 0
-                            stats['users'][user_id] += len(samples)
+                    n_samples = _count_csv_rows(user_file)
+                    stats['total_user_samples'] += n_samples
+                    
+                    # Count by user_id
+                    if n_samples:
+                        first = _first_csv_row(user_file) or {}
+                        user_id = first.get('user_id', 'unknown')
+                        if user_id not in stats['users']:
+                            stats['users'][user_id] = 0
+                        stats['users'][user_id] += n_samples
                 except Exception as e:
                     print(f"Error reading {user_file}: {e}")
         
         # Count main training data
         if os.path.exists(main_file):
-            with open(main_file, 'r') as f:
-                reader = csv.DictReader(f)
-                stats['main_training_samples'] = len(list(reader))
+            stats['main_training_samples'] = _count_csv_rows(main_file)
+        
+        _user_data_stats_cache['key'] = cache_key
+        _user_data_stats_cache['value'] = stats
         
         return jsonify({
             'status': 'success',
@@ -1515,20 +2039,55 @@ def get_user_data_stats():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Report hit/miss counts for the recommendation memo cache."""
+    with _recommendation_cache_lock:
+        hits = _recommendation_cache_stats['hits']
+        misses = _recommendation_cache_stats['misses']
+        size = len(_recommendation_cache)
+    
+    return jsonify({
+        'status': 'success',
+        'recommendations': {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'size': size,
+            'max_size': _RECOMMENDATION_CACHE_SIZE
+        }
+    })
+
+
+# Seconds a model file's (exists, size) is reused by the stats route
+_MODEL_STAT_TTL = 5.0
+_model_stat_cache = {}  # path -> (monotonic read time, (exists, size))
+
+
+def _cached_model_stat(path):
+    """(exists, size in bytes) of a model file from one stat(), reused for _MODEL_STAT_TTL seconds."""
+    now = time.monotonic()
+    cached = _model_stat_cache.get(path)
+    if cached is not None and now - cached[0] < _MODEL_STAT_TTL:
+        return cached[1]
+    try:
+        result = (True, os.stat(path).st_size)
+    except FileNotFoundError:
+        result = (False, 0)
+    _model_stat_cache[path] = (now, result)
+    return result
+
+
 @app.route('/api/ml/model/stats', methods=['GET'])
 def get_ml_model_stats():
     """Get statistics about the ML models."""
     try:
         # Get detailed model information
-        anomaly_model_path = os.path.join(MODELS_FOLDER, 'anomaly_model (1).pkl')
-        regression_model_path = os.path.join(MODELS_FOLDER, 'regression_model.pkl')
-        
-        anomaly_model_exists = os.path.exists(anomaly_model_path)
-        regression_model_exists = os.path.exists(regression_model_path)
+        anomaly_model_path = ANOMALY_MODEL
+        regression_model_path = REGRESSION_MODEL
         
-        # Get model sizes if they exist
-        anomaly_size = os.path.getsize(anomaly_model_path) if anomaly_model_exists else 0
-        regression_size = os.path.getsize(regression_model_path) if regression_model_exists else 0
+        anomaly_model_exists, anomaly_size = _cached_model_stat(anomaly_model_path)
+        regression_model_exists, regression_size = _cached_model_stat(regression_model_path)
         
         return jsonify({
             'status': 'success',
@@ -1552,9 +2111,9 @@ def get_ml_model_stats():
             'anomaly_detector': {
                 'model_loaded': anomaly_detector.model_loaded,
                 'detection_method': 'ML Model' if anomaly_detector.model_loaded else 'Rule-Based',
-                'threshold_cpu': 95,
-                'threshold_memory': 90,
-                'threshold_io': 1000
+                'threshold_cpu': CPU_THRESHOLD,
+                'threshold_memory': MEMORY_THRESHOLD,
+                'threshold_io': IO_THRESHOLD_MB
             },
             'recommender': {
                 'model_loaded': recommender.model_loaded,
@@ -1586,65 +2145,67 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'models_available': {
-            'anomaly': os.path.exists(os.path.join(MODELS_FOLDER, 'anomaly_model (1).pkl')),  # Updated to actual filename
-            'regression': os.path.exists(os.path.join(MODELS_FOLDER, 'regression_model.pkl'))
+            # Reuses the model stats route's short-lived stat() results
+            'anomaly': _cached_model_stat(ANOMALY_MODEL)[0],
+            'regression': _cached_model_stat(REGRESSION_MODEL)[0]
         },
         'detectors': {
             'anomaly_loaded': anomaly_detector.model_loaded,
             'recommender_loaded': recommender.model_loaded
         }
     })
+
+
+# Sample performance gain data; static, so the list and its aggregates are
+# built once and shared by every /api/performance/gain response
+_PERF_GAIN_RECOMMENDATIONS = [
+    {
+        'technique': 'Parallel Processing',
+        'predicted_speedup': 2.3,
+        'confidence': 0.85,
+        'estimated_effort': 'Medium',
+        'description': 'Use multiprocessing to parallelize CPU-intensive tasks'
+    },
+    {
+        'technique': 'Memory Optimization',
+        'predicted_speedup': 1.8,
+        'confidence': 0.78,
+        'estimated_effort': 'Low',
+        'description': 'Optimize data structures and reduce memory allocations'
+    },
+    {
+        'technique': 'I/O Optimization',
+        'predicted_speedup': 3.1,
+        'confidence': 0.92,
+        'estimated_effort': 'High',
+        'description': 'Implement asynchronous I/O and connection pooling'
+    },
+    {
+        'technique': 'Algorithm Improvement',
+        'predicted_speedup': 4.2,
+        'confidence': 0.88,
+        'estimated_effort': 'High',
+        'description': 'Replace inefficient algorithms with optimized alternatives'
+    }
+]
+_PERF_GAIN_SPEEDUPS = [r['predicted_speedup'] for r in _PERF_GAIN_RECOMMENDATIONS]
+_PERF_GAIN_AGGREGATE = {
+    'average_speedup': round(sum(_PERF_GAIN_SPEEDUPS) / len(_PERF_GAIN_SPEEDUPS), 2),
+    'maximum_speedup': max(_PERF_GAIN_SPEEDUPS),
+    'minimum_speedup': min(_PERF_GAIN_SPEEDUPS),
+    'total_recommendations': len(_PERF_GAIN_RECOMMENDATIONS)
+}
+
+
 @app.route('/api/performance/gain', methods=['GET'])
 def get_performance_gain_data():
     """Get performance gain predictions and recommendations."""
     try:
-        # Generate sample performance gain data
-        sample_recommendations = [
-            {
-                'technique': 'Parallel Processing',
-                'predicted_speedup': 2.3,
-                'confidence': 0.85,
-                'estimated_effort': 'Medium',
-                'description': 'Use multiprocessing to parallelize CPU-intensive tasks'
-            },
-            {
-                'technique': 'Memory Optimization',
-                'predicted_speedup': 1.8,
-                'confidence': 0.78,
-                'estimated_effort': 'Low',
-                'description': 'Optimize data structures and reduce memory allocations'
-            },
-            {
-                'technique': 'I/O Optimization',
-                'predicted_speedup': 3.1,
-                'confidence': 0.92,
-                'estimated_effort': 'High',
-                'description': 'Implement asynchronous I/O and connection pooling'
-            },
-            {
-                'technique': 'Algorithm Improvement',
-                'predicted_speedup': 4.2,
-                'confidence': 0.88,
-                'estimated_effort': 'High',
-                'description': 'Replace inefficient algorithms with optimized alternatives'
-            }
-        ]
-        
-        # Calculate aggregate metrics
-        avg_speedup = sum(r['predicted_speedup'] for r in sample_recommendations) / len(sample_recommendations)
-        max_speedup = max(r['predicted_speedup'] for r in sample_recommendations)
-        min_speedup = min(r['predicted_speedup'] for r in sample_recommendations)
-        
         return jsonify({
             'status': 'success',
             'timestamp': datetime.now().isoformat(),
-            'recommendations': sample_recommendations,
-            'aggregate_metrics': {
-                'average_speedup': round(avg_speedup, 2),
-                'maximum_speedup': max_speedup,
-                'minimum_speedup': min_speedup,
-                'total_recommendations': len(sample_recommendations)
-            },
+            'recommendations': _PERF_GAIN_RECOMMENDATIONS,
+            'aggregate_metrics': _PERF_GAIN_AGGREGATE,
             'model_info': {
                 'model_loaded': recommender.model_loaded,
                 'prediction_method': 'ML Regression' if recommender.model_loaded else 'Rule-Based Estimation'
@@ -1674,5 +2235,6 @@ if __name__ == '__main__':
     print("- /api/anomaly (POST) - Anomaly detection")
     print("- /api/ml/model/stats (GET) - ML model statistics")
     print("- /api/performance/gain (GET) - Performance recommendations")
-    # Use SocketIO runner so WebSocket events are served correctly
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    # Use SocketIO runner so WebSocket events are served correctly.
+    # Development only; serve.sh runs the app under gunicorn
+    socketio.run(app, debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
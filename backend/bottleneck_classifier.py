@@ -4,12 +4,19 @@ Loads a pre-trained regression model (if available) and provides a classify() he
 that returns CPU/Memory/I/O bottleneck classifications for a PID's recent metrics.
 """
 import os
-import joblib
 import numpy as np
 from datetime import datetime
+from functools import lru_cache
+
+from model_cache import load_model
 
 
 class BottleneckClassifier:
+    # Classifications are memoized per feature vector rounded to this many
+    # decimals; polled windows change slowly, so most calls skip the model
+    FEATURE_DECIMALS = 1
+    CACHE_SIZE = 1024
+
     def __init__(self, model_path=None):
         backend_dir = os.path.dirname(os.path.abspath(__file__))
         if model_path is None:
@@ -20,9 +27,11 @@ class BottleneckClassifier:
         self._load()
 
     def _load(self):
+        # A (re)load starts a fresh cache so no result of the old model survives
+        self._classify_cached = lru_cache(maxsize=self.CACHE_SIZE)(self._classify_features)
         if os.path.exists(self.model_path):
             try:
-                self.model = joblib.load(self.model_path)
+                self.model = load_model(self.model_path, mmap_mode='r')
                 self.model_loaded = True
                 print(f"Bottleneck regression model loaded from {self.model_path}")
             except Exception as e:
@@ -34,82 +43,34 @@ class BottleneckClassifier:
     def _extract_features(self, metrics):
         # Expect list of metric dicts; extract summary features per PID
         if not metrics:
-            return np.array([[0, 0, 0]])
+            return np.zeros((1, 3), dtype=np.float32)
 
-        cpu_vals = [float(m.get('cpu_percent', 0)) for m in metrics]
-        mem_vals = [float(m.get('memory_percent', 0)) for m in metrics]
-        io_vals = [float(m.get('disk_read_mb', 0)) + float(m.get('disk_write_mb', 0)) for m in metrics]
+        # One pass gathers the raw values (NumPy converts numbers and numeric
+        # strings in C), then a single reduction averages every column
+        cpu, mem, read, write = np.array(
+            [(m.get('cpu_percent', 0), m.get('memory_percent', 0),
+              m.get('disk_read_mb', 0), m.get('disk_write_mb', 0)) for m in metrics],
+            dtype=np.float64).reshape(-1, 4).mean(axis=0)
 
-        features = [
-            np.mean(cpu_vals),
-            np.mean(mem_vals),
-            np.mean(io_vals)
-        ]
+        # float32 is what sklearn's tree ensembles work in; handing it over
+        # directly avoids an internal float64 -> float32 copy on predict()
+        return np.array([[cpu, mem, read + write]], dtype=np.float32)
 
-        return np.array([features])
-
-    def classify(self, metrics):
+    def classify(self, metrics, return_proba=False):
         """
         Classify bottleneck type for provided metrics.
 
+        When return_proba is set and the model is a classifier, the label is
+        taken from predict_proba() so the ensemble is only evaluated once,
+        and the class probabilities are added to the result.
+
         Returns list of bottleneck dicts: {type, severity, message, duration}
         """
         try:
             features = self._extract_features(metrics)
-
-            # Try using model if available
-            if self.model_loaded and self.model is not None:
-                try:
-                    pred = None
-                    # If model is classifier
-                    if hasattr(self.model, 'predict'):
-                        pred = self.model.predict(features)
-                    # Map numeric predictions to bottleneck types if applicable
-                    if pred is not None:
-                        label = str(pred[0])
-                        # Attempt to interpret common labels
-                        if label.lower().startswith('cpu') or float(features[0][0]) > 70:
-                            btype = 'CPU-bound'
-                        elif label.lower().startswith('mem') or float(features[0][1]) > 70:
-                            btype = 'Memory-bound'
-                        else:
-                            btype = 'I/O-bound'
-                        severity = int(min(10, max(1, int(round((features[0][0] + features[0][1]) / 20)))))
-                        return [{
-                            'type': btype,
-                            'severity': severity,
-                            'message': f'Predicted by regression model: {label}',
-                            'duration': None
-                        }]
-                except Exception:
-                    # Fallback to heuristic below
-                    pass
-
-            # Heuristic fallback
-            cpu_avg = features[0][0]
-            mem_avg = features[0][1]
-            io_avg = features[0][2]
-
-            # Determine dominant resource
-            if cpu_avg >= mem_avg and cpu_avg >= io_avg:
-                btype = 'CPU-bound'
-                severity = int(min(10, max(3, int(cpu_avg / 10))))
-                message = f'Average CPU {cpu_avg:.1f}% indicates CPU-bound behavior.'
-            elif mem_avg >= cpu_avg and mem_avg >= io_avg:
-                btype = 'Memory-bound'
-                severity = int(min(10, max(3, int(mem_avg / 10))))
-                message = f'Average memory {mem_avg:.1f}% indicates memory pressure.'
-            else:
-                btype = 'I/O-bound'
-                severity = int(min(10, max(3, int(min(10, io_avg / 10)))))
-                message = f'Average I/O {io_avg:.1f}MB indicates I/O bottleneck.'
-
-            return [{
-                'type': btype,
-                'severity': severity,
-                'message': message,
-                'duration': None
-            }]
+            key = tuple(round(float(v), self.FEATURE_DECIMALS) for v in features[0])
+            # Copies, so callers can't alter the cached results
+            return [dict(result) for result in self._classify_cached(key, return_proba)]
         except Exception as e:
             return [{
                 'type': 'unknown',
@@ -118,6 +79,73 @@ class BottleneckClassifier:
                 'duration': None
             }]
 
+    def _classify_features(self, key, return_proba):
+        """Classify one rounded (cpu, memory, io) vector; results are memoized by _classify_cached."""
+        features = np.array([key], dtype=np.float32)
+
+        # Try using model if available
+        if self.model_loaded and self.model is not None:
+            try:
+                pred = None
+                proba = None
+                # If model is classifier
+                if return_proba and hasattr(self.model, 'predict_proba') and hasattr(self.model, 'classes_'):
+                    proba = self.model.predict_proba(features)
+                    pred = self.model.classes_[proba.argmax(axis=1)]
+                elif hasattr(self.model, 'predict'):
+                    pred = self.model.predict(features)
+                # Map numeric predictions to bottleneck types if applicable
+                if pred is not None:
+                    label = str(pred[0])
+                    # Attempt to interpret common labels
+                    if label.lower().startswith('cpu') or float(features[0][0]) > 70:
+                        btype = 'CPU-bound'
+                    elif label.lower().startswith('mem') or float(features[0][1]) > 70:
+                        btype = 'Memory-bound'
+                    else:
+                        btype = 'I/O-bound'
+                    severity = int(min(10, max(1, int(round((features[0][0] + features[0][1]) / 20)))))
+                    result = {
+                        'type': btype,
+                        'severity': severity,
+                        'message': f'Predicted by regression model: {label}',
+                        'duration': None
+                    }
+                    if proba is not None:
+                        result['probabilities'] = {
+                            str(c): float(p) for c, p in zip(self.model.classes_, proba[0])
+                        }
+                    return (result,)
+            except Exception:
+                # Fallback to heuristic below
+                pass
+
+        # Heuristic fallback
+        cpu_avg = features[0][0]
+        mem_avg = features[0][1]
+        io_avg = features[0][2]
+
+        # Determine dominant resource
+        if cpu_avg >= mem_avg and cpu_avg >= io_avg:
+            btype = 'CPU-bound'
+            severity = int(min(10, max(3, int(cpu_avg / 10))))
+            message = f'Average CPU {cpu_avg:.1f}% indicates CPU-bound behavior.'
+        elif mem_avg >= cpu_avg and mem_avg >= io_avg:
+            btype = 'Memory-bound'
+            severity = int(min(10, max(3, int(mem_avg / 10))))
+            message = f'Average memory {mem_avg:.1f}% indicates memory pressure.'
+        else:
+            btype = 'I/O-bound'
+            severity = int(min(10, max(3, int(min(10, io_avg / 10)))))
+            message = f'Average I/O {io_avg:.1f}MB indicates I/O bottleneck.'
+
+        return ({
+            'type': btype,
+            'severity': severity,
+            'message': message,
+            'duration': None
+        },)
+
 
 if __name__ == '__main__':
     # simple self-test
@@ -0,0 +1,37 @@
+"""
+Shared CSV file helpers for PhaseSentinel.
+Used by the Flask app and DataCollector for training and user data files,
+which may be stored plain or gzip-compressed (.gz).
+"""
+
+import csv
+import gzip
+
+
+def open_data_file(path, mode='r'):
+    """open() for plain or gzip-compressed (.gz) CSV files; text modes use newline=''."""
+    binary = 'b' in mode
+    if path.endswith('.gz'):
+        if binary:
+            return gzip.open(path, mode, compresslevel=6)
+        return gzip.open(path, mode + 't', compresslevel=6, newline='')
+    return open(path, mode) if binary else open(path, mode, newline='')
+
+
+def csv_header(path):
+    """Return the header row of a CSV file ([] if the file is empty)."""
+    with open_data_file(path) as f:
+        return next(csv.reader(f), [])
+
+
+def count_csv_rows(path, chunk_size=1 << 20):
+    """Count data rows in a CSV by counting newlines, without parsing fields."""
+    lines = 0
+    last = b'\n'
+    with open_data_file(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        lines += 1  # unterminated final line
+    return max(lines - 1, 0)  # minus the header
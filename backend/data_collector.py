@@ -7,9 +7,27 @@ import os
 import csv
 import json
 import requests
+import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from csv_utils import csv_header, count_csv_rows
+
+
+def _read_csv(path, **kwargs):
+    """pandas.read_csv keeping every cell as a string, like csv.DictReader; empty files give an empty frame."""
+    try:
+        return pd.read_csv(path, dtype=str, keep_default_na=False, **kwargs)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def _ends_with_newline(path):
+    """Whether a non-empty file's last byte is a newline."""
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b'\n', b'\r')
+
 
 class DataCollector:
     """Utility class for collecting and managing training data from multiple users."""
@@ -25,6 +43,8 @@ class DataCollector:
         self.data_dir = data_dir
         self.user_data_dir = os.path.join(data_dir, 'user_data')
         self.api_url = api_url or 'http://localhost:5000'
+        # path -> ((mtime_ns, size), per-file stats) for get_stats()
+        self._stats_cache = {}
         
         # Ensure directories exist
         os.makedirs(self.data_dir, exist_ok=True)
@@ -59,17 +79,17 @@ class DataCollector:
             if col not in fieldnames:
                 fieldnames.append(col)
         
-        # Write CSV
+        # Write CSV; one timestamp for the whole batch
+        metadata = {
+            'user_id': user_id,
+            'source': source,
+            'label': label,
+            'collection_timestamp': datetime.now().isoformat()
+        }
         with open(user_file, 'w', newline='') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            for metric in metrics:
-                row = dict(metric)
-                row['user_id'] = user_id
-                row['source'] = source
-                row['label'] = label
-                row['collection_timestamp'] = datetime.now().isoformat()
-                writer.writerow(row)
+            writer.writerows({**metric, **metadata} for metric in metrics)
         
         # Merge if requested
         if merge_to_training:
@@ -81,46 +101,42 @@ class DataCollector:
         """Merge a user data file into main training_data.csv."""
         main_file = os.path.join(self.data_dir, 'training_data.csv')
         
-        # Read user data
-        user_metrics = []
-        with open(user_file, 'r') as f:
-            reader = csv.DictReader(f)
-            user_metrics = list(reader)
+        # Read user data (C tokenizer, columnar; no dict per row)
+        user_df = _read_csv(user_file)
         
-        if not user_metrics:
+        if user_df.empty:
             return
         
-        # Get fieldnames
-        fieldnames = list(user_metrics[0].keys())
-        
-        # Read existing training data
-        existing_metrics = []
-        if os.path.exists(main_file):
-            with open(main_file, 'r') as f:
-                reader = csv.DictReader(f)
-                existing_metrics = list(reader)
-                if existing_metrics:
-                    existing_fieldnames = list(existing_metrics[0].keys())
-                    fieldnames = list(set(fieldnames + existing_fieldnames))
-        
-        # Merge
-        all_metrics = existing_metrics + user_metrics
-        
-        # Write merged data
-        with open(main_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for metric in all_metrics:
-                row = {field: metric.get(field, '') for field in fieldnames}
-                writer.writerow(row)
+        main_header = csv_header(main_file) if os.path.exists(main_file) else []
+        if main_header and set(user_df.columns) <= set(main_header):
+            # Schema unchanged: append the new rows in the existing column
+            # order (missing cells blank) and leave existing rows untouched
+            needs_newline = not _ends_with_newline(main_file)
+            with open(main_file, 'a', newline='') as f:
+                if needs_newline:
+                    f.write('\n')
+                user_df.reindex(columns=main_header, fill_value='').to_csv(f, header=False, index=False)
+        else:
+            # New columns (or no training file yet): rewrite with the union
+            existing_df = _read_csv(main_file) if main_header else pd.DataFrame()
+            
+            # Merge; columns are the union, existing ones first, missing cells blank
+            merged = pd.concat([existing_df, user_df], ignore_index=True).fillna('')
+            
+            # Write merged data
+            merged.to_csv(main_file, index=False)
         
-        print(f"Merged {len(user_metrics)} samples from {user_file} into {main_file}")
+        print(f"Merged {len(user_df)} samples from {user_file} into {main_file}")
+    
+    def _user_files(self):
+        """Paths of the visible *.csv files in user_data_dir, from one scandir pass."""
+        with os.scandir(self.user_data_dir) as it:
+            return [entry.path for entry in it
+                    if entry.name.endswith('.csv') and not entry.name.startswith('.') and entry.is_file()]
     
     def merge_all_user_data(self):
         """Merge all user data files into training_data.csv."""
-        import glob
-        
-        user_files = glob.glob(os.path.join(self.user_data_dir, '*.csv'))
+        user_files = self._user_files()
         
         if not user_files:
             print("No user data files found")
@@ -169,10 +185,29 @@ class DataCollector:
             print(f"Error sending data to API: {e}")
             raise
     
+    def _cached_file_stats(self, cache, path, compute):
+        """compute(path), reused from the previous get_stats() call if the file is unchanged."""
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._stats_cache.get(path)
+        value = cached[1] if cached is not None and cached[0] == key else compute(path)
+        cache[path] = (key, value)
+        return value
+    
+    @staticmethod
+    def _user_file_stats(path):
+        """(sample count, [(user_id, count), ...]) for one user data file."""
+        # Only the user_id column is materialized; rows are counted
+        # per user from it in one C-level pass
+        df = _read_csv(path, usecols=lambda name: name == 'user_id')
+        if 'user_id' in df:
+            counts = df['user_id'].value_counts(sort=False)
+            return len(df), [(user_id, int(count)) for user_id, count in counts.items()]
+        sample_count = count_csv_rows(path)
+        return sample_count, [('unknown', sample_count)] if sample_count else []
+    
     def get_stats(self):
         """Get statistics about collected data."""
-        import glob
-        
         stats = {
             'user_files': 0,
             'total_user_samples': 0,
@@ -181,31 +216,29 @@ class DataCollector:
         }
         
         # Count user files
-        user_files = glob.glob(os.path.join(self.user_data_dir, '*.csv'))
+        user_files = self._user_files()
         stats['user_files'] = len(user_files)
         
+        users = stats['users']
+        # Files are only re-parsed when their mtime or size changed; the cache
+        # is rebuilt each call so entries of deleted files are dropped
+        cache = {}
         for user_file in user_files:
             try:
-                with open(user_file, 'r') as f:
-                    reader = csv.DictReader(f)
-                    samples = list(reader)
-                    stats['total_user_samples'] += len(samples)
-                    
-                    if samples:
-                        user_id = samples[0].get('user_id', 'unknown')
-                        if user_id not in stats['users']:
-                            stats['users'][user_id] = 0
-                        stats['users'][user_id] += len(samples)
+                sample_count, counts = self._cached_file_stats(cache, user_file, self._user_file_stats)
+                stats['total_user_samples'] += sample_count
+                
+                for user_id, count in counts:
+                    users[user_id] = users.get(user_id, 0) + count
             except Exception as e:
                 print(f"Error reading {user_file}: {e}")
         
         # Count main training data
         main_file = os.path.join(self.data_dir, 'training_data.csv')
         if os.path.exists(main_file):
-            with open(main_file, 'r') as f:
-                reader = csv.DictReader(f)
-                stats['main_training_samples'] = len(list(reader))
+            stats['main_training_samples'] = self._cached_file_stats(cache, main_file, count_csv_rows)
         
+        self._stats_cache = cache
         return stats
 
 
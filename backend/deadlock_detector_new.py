@@ -1,13 +1,14 @@
 """
 DeadlockDetector - Detects potential deadlocks using wait-for graph analysis
-Uses networkx to build wait-for graph and detect cycles (potential deadlocks)
+Keeps the wait-for graph as a plain adjacency dict and finds cycles (potential
+deadlocks) with an iterative Tarjan SCC pass
 """
 
 import threading
-import networkx as nx
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 from datetime import datetime
-import json
+import orjson
 import os
 import logging
 
@@ -15,14 +16,30 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Most recent log entries kept in memory; older ones are dropped
+LOG_HISTORY = 100000
+
+
 class DeadlockDetector:
     """Detects deadlock risks by analyzing lock wait-for graphs."""
     
     def __init__(self):
         self.locks = {}  # lock_id -> threading.Lock
-        self.acquisitions = []  # List of lock acquisitions
-        self.wait_graph = nx.DiGraph()
-        self.lock_logs = []
+        # Bounded ring buffers, so memory stays constant under lock churn
+        self.acquisitions = deque(maxlen=LOG_HISTORY)  # Recent lock acquisitions
+        self._acquisition_count = 0  # All acquisitions, including dropped ones
+        # Thread-to-thread wait-for graph: waiter -> threads holding locks it
+        # timed out on. Edges are pruned on release, so it only holds live waits.
+        self.wait_graph = defaultdict(set)
+        self.holders = {}  # lock_id -> thread_id currently holding it
+        self.waiters = defaultdict(set)  # lock_id -> threads that timed out on it
+        # (waiter, holder) -> number of held locks the waiter timed out on;
+        # the edge stays until the holder has released all of them
+        self._wait_counts = defaultdict(int)
+        self.lock_logs = deque(maxlen=LOG_HISTORY)
+        self._log_version = 0  # Bumped per log entry; lets saves skip unchanged logs
+        self._saved = None  # (filepath, _log_version) of the last save
+        self._cycles = None  # Cycles of the current graph; None after any edge change
         
     def create_lock(self, lock_id):
         """Create a new lock with given ID."""
@@ -46,10 +63,9 @@ class DeadlockDetector:
             self.create_lock(lock_id)
         
         lock = self.locks[lock_id]
-        timestamp = datetime.now().isoformat()
-        
+        # Log entries keep epoch seconds; ISO strings are only built on export
         log_entry = {
-            'timestamp': timestamp,
+            'timestamp': time.time(),
             'thread_id': thread_id,
             'lock_id': lock_id,
             'action': 'acquire_attempt',
@@ -61,18 +77,24 @@ class DeadlockDetector:
             log_entry['acquired'] = acquired
             if acquired:
                 log_entry['action'] = 'acquired'
+                self.holders[lock_id] = thread_id
             else:
                 log_entry['action'] = 'timeout'
-                # Add wait edge in graph
-                self._add_wait_edge(thread_id, lock_id)
+                # The waiter waits on whoever holds the lock
+                holder = self.holders.get(lock_id)
+                if holder is not None and holder != thread_id and thread_id not in self.waiters[lock_id]:
+                    self.waiters[lock_id].add(thread_id)
+                    self._wait_counts[(thread_id, holder)] += 1
+                    self._add_wait_edge(thread_id, holder)
             
             self.acquisitions.append(log_entry)
-            self.lock_logs.append(log_entry)
+            self._acquisition_count += 1
+            self._log(log_entry)
             return acquired
             
         except Exception as e:
             log_entry['error'] = str(e)
-            self.lock_logs.append(log_entry)
+            self._log(log_entry)
             return False
     
     def release_lock(self, thread_id, lock_id):
@@ -86,27 +108,146 @@ class DeadlockDetector:
         if lock_id in self.locks:
             try:
                 self.locks[lock_id].release()
-                timestamp = datetime.now().isoformat()
                 log_entry = {
-                    'timestamp': timestamp,
+                    'timestamp': time.time(),
                     'thread_id': thread_id,
                     'lock_id': lock_id,
                     'action': 'release'
                 }
-                self.lock_logs.append(log_entry)
-                # Remove wait edge if it exists
-                self._remove_wait_edge(thread_id, lock_id)
+                self._log(log_entry)
+                # Nobody waits on the recorded holder for this lock any more
+                # (whoever made the call); a waiter's edge goes once it waits
+                # on none of that holder's locks
+                holder = self.holders.pop(lock_id, None)
+                waiters = self.waiters.pop(lock_id, ())
+                if holder is not None:
+                    for waiter in waiters:
+                        key = (waiter, holder)
+                        count = self._wait_counts.get(key, 0) - 1
+                        if count > 0:
+                            self._wait_counts[key] = count
+                        else:
+                            self._wait_counts.pop(key, None)
+                            self._remove_wait_edge(waiter, holder)
             except Exception as e:
                 logger.warning(f"Error releasing lock {lock_id}: {e}")
     
-    def _add_wait_edge(self, thread_id, lock_id):
-        """Add an edge indicating thread is waiting for lock."""
-        self.wait_graph.add_edge(thread_id, lock_id)
+    def _log(self, log_entry):
+        """Append an entry to the in-memory lock log."""
+        self.lock_logs.append(log_entry)
+        self._log_version += 1
+    
+    def _add_wait_edge(self, waiter, holder):
+        """Add an edge indicating waiter is blocked on a lock holder holds."""
+        waits = self.wait_graph[waiter]
+        if holder not in waits:
+            waits.add(holder)
+            self._cycles = None
     
-    def _remove_wait_edge(self, thread_id, lock_id):
-        """Remove a wait edge when lock is released."""
-        if self.wait_graph.has_edge(thread_id, lock_id):
-            self.wait_graph.remove_edge(thread_id, lock_id)
+    def _remove_wait_edge(self, waiter, holder):
+        """Remove a wait edge, dropping the waiter's entry once it waits on nobody."""
+        waits = self.wait_graph.get(waiter)
+        if waits is not None and holder in waits:
+            waits.discard(holder)
+            if not waits:
+                del self.wait_graph[waiter]
+            self._cycles = None
+    
+    def _strongly_connected_components(self):
+        """
+        Yield the wait graph's strongly connected components (Tarjan).
+
+        Iterative, with an explicit stack of (node, successor iterator)
+        frames, so deep wait chains cannot hit Python's recursion limit.
+        """
+        graph = self.wait_graph
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        counter = 0
+        for root in list(graph):
+            if root in index:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            frames = [(root, iter(graph.get(root, ())))]
+            while frames:
+                node, successors = frames[-1]
+                for succ in successors:
+                    if succ not in index:
+                        index[succ] = lowlink[succ] = counter
+                        counter += 1
+                        stack.append(succ)
+                        on_stack.add(succ)
+                        frames.append((succ, iter(graph.get(succ, ()))))
+                        break
+                    if succ in on_stack and index[succ] < lowlink[node]:
+                        lowlink[node] = index[succ]
+                else:
+                    # All successors done: close the component or report up
+                    frames.pop()
+                    if frames:
+                        parent = frames[-1][0]
+                        if lowlink[node] < lowlink[parent]:
+                            lowlink[parent] = lowlink[node]
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        yield component
+    
+    def _cycle_in(self, component):
+        """One cycle through the nodes of a strongly connected component (iterative DFS)."""
+        # Every member of a multi-node component has outgoing edges, so
+        # graph[...] below never creates entries
+        graph = self.wait_graph
+        members = set(component)
+        start = component[0]
+        path = [start]
+        position = {start: 0}
+        frames = [iter(graph[start])]
+        while frames:
+            for succ in frames[-1]:
+                if succ not in members:
+                    continue
+                if succ in position:
+                    return path[position[succ]:]
+                position[succ] = len(path)
+                path.append(succ)
+                frames.append(iter(graph[succ]))
+                break
+            else:
+                # Dead end inside the component (cannot happen in an SCC of
+                # size > 1, but keeps the walk well-defined)
+                frames.pop()
+                del position[path.pop()]
+        return []
+    
+    def _component_cycles(self):
+        """
+        One cycle from each strongly connected component that can deadlock.
+
+        Every cycle lies inside a single SCC, so a component with more than
+        one node (or a self-loop) is exactly a deadlock candidate. Finding the
+        SCCs and one DFS cycle in each is O(V + E), where enumerating every
+        simple cycle grows exponentially on dense wait graphs.
+        """
+        cycles = []
+        for component in self._strongly_connected_components():
+            if len(component) == 1:
+                node = component[0]
+                if node in self.wait_graph.get(node, ()):
+                    cycles.append([node])
+                continue
+            cycles.append(self._cycle_in(component))
+        return cycles
     
     def detect(self):
         """
@@ -116,16 +257,25 @@ class DeadlockDetector:
             dict: {risk: bool, cycles: list}
         """
         try:
-            # Check for cycles in the wait-for graph
-            cycles = list(nx.simple_cycles(self.wait_graph))
+            # One representative cycle per deadlocked component, recomputed
+            # only after the graph has changed
+            cycles = self._cycles
+            if cycles is None:
+                cycles = self._cycles = self._component_cycles()
             
             has_deadlock_risk = len(cycles) > 0
             
+            nodes = set(self.wait_graph)
+            edges = 0
+            for waits in self.wait_graph.values():
+                nodes.update(waits)
+                edges += len(waits)
+            
             return {
                 'risk': has_deadlock_risk,
-                'cycles': cycles,
-                'graph_size': self.wait_graph.number_of_nodes(),
-                'edges': self.wait_graph.number_of_edges(),
+                'cycles': list(cycles),
+                'graph_size': len(nodes),
+                'edges': edges,
                 'timestamp': datetime.now().isoformat()
             }
         except Exception as e:
@@ -192,13 +342,13 @@ class DeadlockDetector:
             ]
         
         return {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': detection_result.get('timestamp') or datetime.now().isoformat(),
             'risk_level': risk_level,
             'has_cycles': has_cycles,
             'cycle_count': len(detection_result['cycles']),
             'cycles': detection_result['cycles'][:5],  # First 5 cycles
             'lock_count': len(self.locks),
-            'acquisition_count': len(self.acquisitions),
+            'acquisition_count': self._acquisition_count,
             'recommendations': recommendations,
             'thread_analysis': {
                 'detected_from_thread_states': thread_deadlock_detected,
@@ -207,10 +357,17 @@ class DeadlockDetector:
         }
     
     def save_lock_logs(self, filepath='data/lock_logs.json'):
-        """Save lock acquisition logs to JSON file."""
+        """Save lock acquisition logs to JSON file (skipped if nothing was logged since the last save there)."""
+        if self._saved == (filepath, self._log_version) and os.path.exists(filepath):
+            return
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(self.lock_logs, f, indent=2)
+        version = self._log_version
+        logs = [{**entry, 'timestamp': datetime.fromtimestamp(entry['timestamp']).isoformat()}
+                for entry in self.lock_logs]
+        data = orjson.dumps(logs, option=orjson.OPT_INDENT_2)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        self._saved = (filepath, version)
         logger.info(f"Lock logs saved to {filepath}")
 
 
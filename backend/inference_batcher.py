@@ -0,0 +1,89 @@
+"""
+Request batching for anomaly inference in PhaseSentinel.
+Concurrent API requests hand their feature matrices to one background worker,
+which waits a few milliseconds for more work, stacks everything it collected
+and runs the model once for the whole batch.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceBatcher:
+    """Coalesces concurrent detect_anomalies() calls into one model pass."""
+
+    def __init__(self, detector, max_wait=0.01, max_batch=64):
+        """
+        Args:
+            detector: AnomalyDetector used for inference
+            max_wait: Seconds to keep collecting requests after the first arrives
+            max_batch: Upper bound on requests per model pass
+        """
+        self.detector = detector
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, metrics_data, return_scores=True):
+        """Queue metrics (dict list or feature matrix) and return a Future for the result dict."""
+        # Feature extraction stays on the caller's thread
+        if isinstance(metrics_data, np.ndarray):
+            features = metrics_data
+        else:
+            features = self.detector._extract_features(metrics_data)
+
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((features, return_scores, future))
+        return future
+
+    def detect(self, metrics_data, return_scores=True, timeout=30):
+        """Blocking detect_anomalies() equivalent served through the batch worker."""
+        if not self.detector.model_loaded:
+            # Rule-based fallback has no model call to share
+            return self.detector.detect_anomalies(metrics_data, return_scores=return_scores)
+        try:
+            future = self.submit(metrics_data, return_scores)
+        except Exception as e:
+            # Malformed metrics: report like detect_anomalies() does
+            return self.detector._error_result(e)
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use."""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Collect requests for up to max_wait, then serve them with one model call."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            blocks = [features for features, _, _ in batch]
+            return_scores = [wants_scores for _, wants_scores, _ in batch]
+            try:
+                results = self.detector.detect_anomalies_batch(blocks, return_scores=return_scores)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
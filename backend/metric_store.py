@@ -0,0 +1,110 @@
+"""
+Per-PID metric storage for PhaseSentinel profiling sessions.
+Samples are kept column-wise in preallocated NumPy arrays instead of one dict
+per sample, time windows are found with np.searchsorted, and dicts are only
+rebuilt for the samples a response actually returns.
+"""
+
+import threading
+from itertools import repeat
+
+import numpy as np
+
+from phaseprofiler import PhasProfiler
+
+
+# Numeric sample fields, in the order they appear in a metric dict
+METRIC_FIELDS = ('cpu_percent', 'memory_percent', 'memory_used_mb', 'disk_read_mb',
+                 'disk_write_mb', 'network_sent_mb', 'network_recv_mb')
+
+# Phase ids, shared with the packed Socket.IO frames; unknown phases are 255
+_PHASE_IDS = {phase: i for i, phase in enumerate(PhasProfiler.PHASES)}
+_UNKNOWN_PHASE = 255
+_PHASE_LABELS = np.full(256, 'unknown', dtype=object)
+_PHASE_LABELS[:len(PhasProfiler.PHASES)] = PhasProfiler.PHASES
+_RECORD_KEYS = ('timestamp',) + METRIC_FIELDS + ('phase', 'pid')
+
+
+class MetricStore:
+    """Bounded, timestamp-ordered sample history for one PID."""
+
+    def __init__(self, pid, capacity, start_time=0.0):
+        """
+        Args:
+            pid: Process the samples belong to
+            capacity: Number of most recent samples to keep
+            start_time: Wall-clock session start; sample timestamps are
+                seconds since this time
+        """
+        self.pid = pid
+        self.capacity = capacity
+        self.start_time = start_time
+        # Twice the capacity so dropping old samples is one copy per
+        # `capacity` appends rather than a shift on every append
+        size = 2 * capacity
+        self._timestamp = np.empty(size, dtype=np.float64)
+        # Percentages and MB totals need far less than float64's precision
+        self._columns = {field: np.empty(size, dtype=np.float32) for field in METRIC_FIELDS}
+        self._phase = np.empty(size, dtype=np.uint8)
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def append(self, metric):
+        """Store one metric dict as produced by the profiling loop."""
+        with self._lock:
+            if self._end == len(self._timestamp):
+                self._compact()
+            i = self._end
+            self._timestamp[i] = metric['timestamp']
+            for field, column in self._columns.items():
+                column[i] = metric[field]
+            self._phase[i] = _PHASE_IDS.get(metric.get('phase'), _UNKNOWN_PHASE)
+            self._end = i + 1
+            if self._end - self._start > self.capacity:
+                self._start += 1
+
+    def _compact(self):
+        """Move the retained samples to the front of the arrays."""
+        start, end = self._start, self._end
+        n = end - start
+        for array in (self._timestamp, self._phase, *self._columns.values()):
+            array[:n] = array[start:end]
+        self._start, self._end = 0, n
+
+    def _records(self, start, stop):
+        """Metric dicts for absolute array positions [start, stop)."""
+        if stop <= start:
+            return []
+        columns = [self._timestamp[start:stop].tolist()]
+        columns.extend(self._columns[field][start:stop].tolist() for field in METRIC_FIELDS)
+        columns.append(_PHASE_LABELS[self._phase[start:stop]].tolist())
+        return [dict(zip(_RECORD_KEYS, row)) for row in zip(*columns, repeat(self.pid))]
+
+    def records(self, offset=0, stop=None):
+        """Metric dicts for samples [offset, stop) counted from the oldest retained one."""
+        with self._lock:
+            n = self._end - self._start
+            stop = n if stop is None else min(stop, n)
+            return self._records(self._start + min(offset, n), self._start + stop)
+
+    def tail(self, count):
+        """The last `count` samples as metric dicts."""
+        with self._lock:
+            return self._records(max(self._start, self._end - count), self._end)
+
+    def latest(self):
+        """The most recent sample as a metric dict, or None if there are none."""
+        records = self.tail(1)
+        return records[0] if records else None
+
+    def since(self, cutoff):
+        """Samples taken at or after wall-clock time cutoff, found by binary search."""
+        with self._lock:
+            start, end = self._start, self._end
+            offset = cutoff - self.start_time
+            first = start + int(np.searchsorted(self._timestamp[start:end], offset, side='left'))
+            return self._records(first, end)
@@ -0,0 +1,41 @@
+"""
+Shared model loader for PhaseSentinel.
+Keeps one deserialized copy of each model file per process so detectors,
+recommenders and classifiers created per request or per profiling session
+do not unpickle the same model again.
+"""
+
+import os
+import threading
+import joblib
+
+
+_MODEL_CACHE = {}  # (abspath, mmap_mode) -> (mtime, model)
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def load_model(model_path, mmap_mode=None):
+    """
+    Load a joblib/pickle model, reusing the cached instance while the file is unchanged.
+
+    Args:
+        model_path: Path to the serialized model
+        mmap_mode: Passed to joblib.load; 'r' memory-maps the NumPy arrays
+            inside the estimator so worker processes share them through
+            the page cache instead of each holding a private copy
+
+    Returns:
+        The deserialized model object
+    """
+    path = os.path.abspath(model_path)
+    key = (path, mmap_mode)
+    mtime = os.path.getmtime(path)
+
+    with _MODEL_CACHE_LOCK:
+        cached = _MODEL_CACHE.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        model = joblib.load(path, mmap_mode=mmap_mode)
+        _MODEL_CACHE[key] = (mtime, model)
+        return model
@@ -0,0 +1,54 @@
+"""
+orjson-backed JSON provider for the PhaseSentinel Flask app.
+Installed as app.json, and as the Socket.IO packet codec, so responses and
+events are encoded in C and accept NumPy arrays and scalars directly,
+without converting them to lists first.
+"""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding."""
+
+    # Integer dict keys (e.g. PIDs) are allowed; NumPy values pass through
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    # Keys keep insertion order; sorting every response is wasted work
+    sort_keys = False
+
+    def _dumps_bytes(self, obj, indent=False):
+        """Encode obj to JSON bytes, falling back to default() for other types."""
+        option = self.option | (orjson.OPT_INDENT_2 if indent else 0)
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        """Serialize data as a JSON string (stdlib keyword arguments are ignored)."""
+        return self._dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON from a string or bytes."""
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build the JSON response body as bytes, skipping the str round trip."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumps_bytes(obj, indent=indent) + b'\n',
+                                        mimetype=self.mimetype)
+
+
+class ORJSONCodec:
+    """dumps/loads pair for python-socketio packets, passed as SocketIO(json=...)."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        """Serialize a packet payload to str (stdlib keyword arguments such as separators are ignored)."""
+        return orjson.dumps(obj, option=ORJSONProvider.option).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        """Deserialize a packet payload."""
+        return orjson.loads(s)
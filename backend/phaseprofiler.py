@@ -13,6 +13,7 @@ import subprocess
 from datetime import datetime
 import argparse
 import logging
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +22,16 @@ logger = logging.getLogger(__name__)
 class PhasProfiler:
     """Profiles system metrics and detects execution phases."""
     
+    # Thresholds for phase detection
+    CPU_THRESHOLD = 70.0  # CPU > 70% indicates CPU-bound
+    MEMORY_THRESHOLD = 70.0  # Memory > 70% indicates memory-bound
+    IO_THRESHOLD = 10.0  # I/O > 10 MB/s indicates I/O-bound
+    IDLE_CPU_THRESHOLD = 10.0
+    IDLE_MEMORY_THRESHOLD = 30.0
+    # Phase labels; the index is the phase id used in packed metric frames
+    PHASES = ('idle', 'cpu_bound', 'io_bound', 'memory_bound', 'mixed')
+    _PHASE_LABELS = np.array(PHASES, dtype=object)
+    
     def __init__(self, output_file='training_data.csv', sample_interval=0.5):
         self.output_file = output_file
         self.metrics = []
@@ -159,12 +170,11 @@ class PhasProfiler:
         Returns:
             Phase label: 'cpu_bound', 'io_bound', 'memory_bound', 'idle', or 'mixed'
         """
-        # Thresholds for phase detection
-        cpu_threshold = 70.0  # CPU > 70% indicates CPU-bound
-        memory_threshold = 70.0  # Memory > 70% indicates memory-bound
-        io_threshold = 10.0  # I/O > 10 MB/s indicates I/O-bound
-        idle_cpu_threshold = 10.0
-        idle_memory_threshold = 30.0
+        cpu_threshold = self.CPU_THRESHOLD
+        memory_threshold = self.MEMORY_THRESHOLD
+        io_threshold = self.IO_THRESHOLD
+        idle_cpu_threshold = self.IDLE_CPU_THRESHOLD
+        idle_memory_threshold = self.IDLE_MEMORY_THRESHOLD
         
         # Rule-based classification
         if cpu_percent < idle_cpu_threshold and memory_percent < idle_memory_threshold:
@@ -178,6 +188,43 @@ class PhasProfiler:
         else:
             return 'mixed'
     
+    def detect_phase_ids(self, cpu_percent, memory_percent, io_rate):
+        """
+        Vectorized detect_phase() over whole metric columns, as phase ids.
+        
+        Args:
+            cpu_percent: Array of CPU usage percentages
+            memory_percent: Array of memory usage percentages
+            io_rate: Array of I/O rates in MB/s
+            
+        Returns:
+            numpy.ndarray of uint8 indices into PHASES, same rules and
+            precedence as detect_phase()
+        """
+        cpu = np.asarray(cpu_percent, dtype=np.float64)
+        memory = np.asarray(memory_percent, dtype=np.float64)
+        io = np.asarray(io_rate, dtype=np.float64)
+        
+        conditions = [
+            (cpu < self.IDLE_CPU_THRESHOLD) & (memory < self.IDLE_MEMORY_THRESHOLD),
+            (cpu > self.CPU_THRESHOLD) & (io < self.IO_THRESHOLD) & (memory < self.MEMORY_THRESHOLD),
+            (io > self.IO_THRESHOLD) & (cpu < self.CPU_THRESHOLD),
+            (memory > self.MEMORY_THRESHOLD) & (cpu < self.CPU_THRESHOLD)
+        ]
+        # np.select takes the first matching condition, like the elif chain;
+        # the choices are indices of 'idle', 'cpu_bound', 'io_bound', 'memory_bound'
+        # and the default is 'mixed'
+        return np.select(conditions, [0, 1, 2, 3], default=4).astype(np.uint8)
+    
+    def detect_phases(self, cpu_percent, memory_percent, io_rate):
+        """
+        Vectorized detect_phase() over whole metric columns.
+        
+        Returns:
+            numpy.ndarray (object dtype) of phase labels; see detect_phase_ids()
+        """
+        return self._PHASE_LABELS[self.detect_phase_ids(cpu_percent, memory_percent, io_rate)]
+    
     def save_to_csv(self, filepath=None):
         """Save collected metrics to CSV file."""
         if not self.metrics:
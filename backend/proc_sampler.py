@@ -0,0 +1,168 @@
+"""
+Per-process resource sampling for PhaseSentinel's profiling loop.
+On Linux the /proc files of the profiled process are opened once and re-read
+with os.pread() every tick, and CPU usage is computed from the CPU-time delta
+between ticks instead of blocking in psutil's cpu_percent(interval=0.1).
+Other platforms fall back to psutil with non-blocking CPU sampling.
+Network counters are system-wide, so they are refreshed at a lower rate and
+shared by every sampler.
+"""
+
+import os
+import threading
+import time
+import psutil
+
+
+_MB = 1024 ** 2
+_PROC_AVAILABLE = os.path.exists('/proc/self/stat')
+
+# Seconds between reads of the system-wide network counters
+NET_SAMPLE_INTERVAL = 10.0
+_net_cache = {'ts': float('-inf'), 'value': (0, 0)}
+_net_cache_lock = threading.Lock()
+
+
+def _system_net_io():
+    """System-wide (bytes_sent, bytes_recv), re-read at most every NET_SAMPLE_INTERVAL seconds."""
+    now = time.monotonic()
+    with _net_cache_lock:
+        if now - _net_cache['ts'] >= NET_SAMPLE_INTERVAL:
+            net_io = psutil.net_io_counters()
+            _net_cache['value'] = (net_io.bytes_sent, net_io.bytes_recv) if net_io else (0, 0)
+            _net_cache['ts'] = now
+        return _net_cache['value']
+
+
+def _pread(fd, size=4096):
+    """Read a /proc file from the start through an already open descriptor."""
+    return os.pread(fd, size, 0)
+
+
+class ProcessSampler:
+    """Samples CPU, memory, disk and network counters for one PID."""
+
+    def __init__(self, pid):
+        """
+        Args:
+            pid: Process to sample
+
+        Raises:
+            psutil.NoSuchProcess: If the process does not exist
+        """
+        self.pid = pid
+        self._fds = {}
+        self._process = None
+
+        if _PROC_AVAILABLE:
+            self._open_proc_files()
+        else:
+            self._process = psutil.Process(pid)
+            self._process.cpu_percent(interval=None)  # Prime the CPU-time baseline
+
+    def _open_proc_files(self):
+        """Open the /proc files once and seed the CPU baseline at process start."""
+        try:
+            self._fds['stat'] = os.open(f'/proc/{self.pid}/stat', os.O_RDONLY)
+            self._fds['statm'] = os.open(f'/proc/{self.pid}/statm', os.O_RDONLY)
+        except FileNotFoundError:
+            self.close()
+            raise psutil.NoSuchProcess(self.pid)
+        try:
+            self._fds['io'] = os.open(f'/proc/{self.pid}/io', os.O_RDONLY)
+        except PermissionError:
+            pass  # I/O counters need ptrace access; report zero instead
+
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        self._total_memory = psutil.virtual_memory().total
+
+        # First sample reports the average since the process started
+        fields = self._read_stat()
+        self._prev_cpu_time = 0.0
+        self._prev_wall_time = psutil.boot_time() + int(fields[19]) / self._clock_ticks
+
+    def _read_stat(self):
+        """Fields of /proc/<pid>/stat after the command name, state first."""
+        data = _pread(self._fds['stat'])
+        # The command name is parenthesised and may itself contain spaces
+        return data[data.rindex(b')') + 2:].split()
+
+    def _read_io(self):
+        """(read_bytes, write_bytes) from /proc/<pid>/io."""
+        if 'io' not in self._fds:
+            return 0, 0
+        read_bytes = write_bytes = 0
+        for line in _pread(self._fds['io']).splitlines():
+            if line.startswith(b'read_bytes:'):
+                read_bytes = int(line[11:])
+            elif line.startswith(b'write_bytes:'):
+                write_bytes = int(line[12:])
+        return read_bytes, write_bytes
+
+    def sample(self):
+        """
+        Take one sample.
+
+        Returns:
+            Dictionary with cpu_percent, memory_percent, memory_used_mb,
+            disk_read_mb, disk_write_mb, network_sent_mb and network_recv_mb
+
+        Raises:
+            psutil.NoSuchProcess: If the process has exited
+        """
+        if self._process is not None:
+            return self._sample_psutil()
+
+        try:
+            fields = self._read_stat()
+            rss = int(_pread(self._fds['statm']).split()[1]) * self._page_size
+            read_bytes, write_bytes = self._read_io()
+        except ProcessLookupError:
+            raise psutil.NoSuchProcess(self.pid)
+        sent, recv = _system_net_io()
+
+        now = time.time()
+        cpu_time = (int(fields[11]) + int(fields[12])) / self._clock_ticks
+        elapsed = now - self._prev_wall_time
+        cpu_percent = (cpu_time - self._prev_cpu_time) / elapsed * 100 if elapsed > 0 else 0.0
+        self._prev_cpu_time, self._prev_wall_time = cpu_time, now
+
+        return {
+            'cpu_percent': cpu_percent,
+            'memory_percent': rss / self._total_memory * 100,
+            'memory_used_mb': rss / _MB,
+            'disk_read_mb': read_bytes / _MB,
+            'disk_write_mb': write_bytes / _MB,
+            'network_sent_mb': sent / _MB,
+            'network_recv_mb': recv / _MB,
+        }
+
+    def _sample_psutil(self):
+        """Portable sample through psutil for platforms without /proc."""
+        p = self._process
+        with p.oneshot():
+            cpu_percent = p.cpu_percent(interval=None)
+            memory_info = p.memory_info()
+            memory_percent = p.memory_percent()
+            try:
+                io_counters = p.io_counters()
+            except (AttributeError, psutil.AccessDenied):
+                io_counters = None
+        sent, recv = _system_net_io()
+
+        return {
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory_percent,
+            'memory_used_mb': memory_info.rss / _MB,
+            'disk_read_mb': io_counters.read_bytes / _MB if io_counters else 0,
+            'disk_write_mb': io_counters.write_bytes / _MB if io_counters else 0,
+            'network_sent_mb': sent / _MB,
+            'network_recv_mb': recv / _MB,
+        }
+
+    def close(self):
+        """Close the cached /proc descriptors."""
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
@@ -4,10 +4,11 @@ Provides optimization recommendations with predicted speedup using regression mo
 """
 
 import os
-import joblib
 import numpy as np
 from datetime import datetime
 
+from model_cache import load_model
+
 
 class OptimizationRecommender:
     """Provides optimization recommendations with speedup predictions."""
@@ -22,7 +23,7 @@ class OptimizationRecommender:
         """Load the regression model if it exists."""
         if os.path.exists(self.model_path):
             try:
-                self.model = joblib.load(self.model_path)
+                self.model = load_model(self.model_path, mmap_mode='r')
                 self.model_loaded = True
                 print(f"Regression model loaded from {self.model_path}")
             except Exception as e:
@@ -83,7 +84,15 @@ class OptimizationRecommender:
             elif isinstance(metrics_data, list):
                 features = self._extract_features(metrics_data)
             else:
-                features = metrics_data
+                # Coerce once to a typed matrix so the model skips its own conversion
+                features = np.asarray(metrics_data, dtype=np.float32)
+                if features.ndim != 2:
+                    return {
+                        'timestamp': datetime.now().isoformat(),
+                        'model_loaded': True,
+                        'error': 'features must be 2-D',
+                        'recommendations': []
+                    }
             
             # Predict speedup using the model
             speedup_predictions = self.model.predict(features)
@@ -294,8 +303,10 @@ class OptimizationRecommender:
         Returns:
             numpy.ndarray: Feature matrix
         """
-        features = []
-        for metric in metrics_data:
+        # Allocate the matrix up front and write rows in place instead of
+        # building a list of lists and copying it into an array
+        features = np.empty((len(metrics_data), 7), dtype=np.float32)
+        for i, metric in enumerate(metrics_data):
             # memory can be stored as GB or MB; normalize to GB
             mem_gb = None
             if metric.get('memory_used_gb') is not None:
@@ -316,7 +327,7 @@ class OptimizationRecommender:
             else:
                 mem_gb = 0.0
 
-            feature_vector = [
+            features[i] = (
                 float(metric.get('cpu_percent', 0)),
                 float(metric.get('memory_percent', 0)),
                 mem_gb,
@@ -324,10 +335,9 @@ class OptimizationRecommender:
                 float(metric.get('disk_write_mb', 0)),
                 float(metric.get('network_sent_mb', 0)),
                 float(metric.get('network_recv_mb', 0))
-            ]
-            features.append(feature_vector)
+            )
 
-        return np.array(features)
+        return features
 
 
 if __name__ == '__main__':
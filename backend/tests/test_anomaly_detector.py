@@ -0,0 +1,152 @@
+"""
+Unit tests for AnomalyDetector.
+Tests feature extraction and rule-based (placeholder) detection.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anomaly_detector import AnomalyDetector, _compile_isolation_forest, _flat_decision_function
+
+
+class TestAnomalyDetector(unittest.TestCase):
+    """Test cases for AnomalyDetector class."""
+
+    def setUp(self):
+        """Set up a detector without a trained model."""
+        self.detector = AnomalyDetector(model_path=os.path.join(os.path.dirname(__file__), 'missing.pkl'))
+        self.metrics = [
+            {'cpu_percent': 10, 'memory_percent': 30, 'memory_used_gb': 2.0,
+             'disk_read_mb': 10, 'disk_write_mb': 5},
+            {'cpu_percent': 98, 'memory_percent': 95, 'memory_used_gb': 1.5,
+             'disk_read_mb': 5, 'disk_write_mb': 2},
+            {'cpu_percent': '15', 'memory_percent': '20', 'memory_used_gb': '8.0',
+             'disk_read_mb': '20', 'disk_write_mb': '1500'}
+        ]
+
+    def test_extract_features(self):
+        """Test feature matrix shape, dtype and column order."""
+        features = self.detector._extract_features(self.metrics)
+        self.assertEqual(features.shape, (3, 5))
+        self.assertEqual(features.dtype, np.float32)
+        np.testing.assert_allclose(features[2], [15, 20, 8.0, 20, 1500])
+
+    def test_extract_features_missing_keys(self):
+        """Test that missing keys default to zero."""
+        features = self.detector._extract_features([{}])
+        np.testing.assert_array_equal(features, np.zeros((1, 5), dtype=np.float32))
+
+    def test_placeholder_detection(self):
+        """Test rule-based alerts are reported per sample in order."""
+        results = self.detector.detect_anomalies(self.metrics)
+        self.assertFalse(results['model_loaded'])
+        self.assertEqual(results['total_samples'], 3)
+        self.assertEqual(results['anomalies_detected'], 3)
+        self.assertEqual([a['sample_index'] for a in results['alerts']], [1, 1, 2])
+        self.assertEqual([a['severity'] for a in results['alerts']], ['high', 'high', 'medium'])
+        self.assertIn('(98.0%)', results['alerts'][0]['message'])
+
+    def test_placeholder_detection_array_input(self):
+        """Test that a feature matrix gives the same result as dict input."""
+        features = self.detector._extract_features(self.metrics)
+        from_dicts = self.detector.detect_anomalies(self.metrics)
+        from_array = self.detector.detect_anomalies(features)
+        self.assertEqual(from_array['total_samples'], 3)
+        self.assertEqual(from_array['alerts'], from_dicts['alerts'])
+
+    def test_placeholder_detection_no_anomalies(self):
+        """Test the informational alert when nothing is flagged."""
+        results = self.detector.detect_anomalies(self.metrics[:1])
+        self.assertEqual(results['anomalies_detected'], 0)
+        self.assertEqual(results['alerts'][0]['type'], 'info')
+
+    def test_placeholder_detection_empty(self):
+        """Test detection on an empty metrics list."""
+        results = self.detector.detect_anomalies([])
+        self.assertEqual(results['total_samples'], 0)
+        self.assertEqual(results['anomalies_detected'], 0)
+
+
+class TestCompiledIsolationForest(unittest.TestCase):
+    """Test the flattened IsolationForest against sklearn."""
+
+    def test_matches_sklearn_decision_function(self):
+        """Test compiled scores equal IsolationForest.decision_function()."""
+        from sklearn.ensemble import IsolationForest
+        rng = np.random.default_rng(0)
+        X = (rng.random((300, 5)) * [100, 100, 16, 2000, 2000]).astype(np.float32)
+        for model in (IsolationForest(n_estimators=20, random_state=0).fit(X),
+                      IsolationForest(n_estimators=20, max_features=3, random_state=0).fit(X)):
+            forest = _compile_isolation_forest(model)
+            np.testing.assert_allclose(_flat_decision_function(forest, X),
+                                       model.decision_function(X), atol=1e-12)
+
+    def test_export_flat_roundtrip(self):
+        """Test that an exported forest loads without the pickle and scores the same."""
+        import joblib
+        from sklearn.ensemble import IsolationForest
+        rng = np.random.default_rng(1)
+        X = (rng.random((200, 5)) * 100).astype(np.float32)
+        model = IsolationForest(n_estimators=10, random_state=0).fit(X)
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'anomaly_model.pkl')
+            joblib.dump(model, model_path)
+            AnomalyDetector(model_path=model_path).export_flat()
+            os.remove(model_path)
+
+            detector = AnomalyDetector(model_path=model_path)
+            self.assertTrue(detector.model_loaded)
+            self.assertIsNone(detector.model)
+            results = detector.detect_anomalies(X)
+            np.testing.assert_allclose(results['anomaly_scores'], model.decision_function(X), atol=1e-12)
+
+    def test_stale_export_falls_back_to_pickle(self):
+        """Test that a retrained pickle wins over an export made from the old one."""
+        import joblib
+        from sklearn.ensemble import IsolationForest
+        rng = np.random.default_rng(3)
+        X = (rng.random((200, 5)) * 100).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'anomaly_model.pkl')
+            joblib.dump(IsolationForest(n_estimators=10, random_state=0).fit(X), model_path)
+            AnomalyDetector(model_path=model_path).export_flat()
+
+            retrained = IsolationForest(n_estimators=15, random_state=1).fit(X)
+            joblib.dump(retrained, model_path)
+            detector = AnomalyDetector(model_path=model_path)
+            self.assertIsNotNone(detector.model)
+            results = detector.detect_anomalies(X)
+            np.testing.assert_allclose(results['anomaly_scores'], retrained.decision_function(X), atol=1e-12)
+
+    def test_detect_anomalies_batch_matches_single(self):
+        """Test that a stacked batch scatters back to the per-request results."""
+        import joblib
+        from sklearn.ensemble import IsolationForest
+        rng = np.random.default_rng(2)
+        X = (rng.random((200, 5)) * 100).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'anomaly_model.pkl')
+            joblib.dump(IsolationForest(n_estimators=10, random_state=0).fit(X), model_path)
+            detector = AnomalyDetector(model_path=model_path)
+
+        blocks = [X[:7], X[7:7], X[7:50]]
+        for batched, block in zip(detector.detect_anomalies_batch(blocks), blocks):
+            single = detector.detect_anomalies(block)
+            np.testing.assert_array_equal(batched['anomalous_indices'], single['anomalous_indices'])
+            np.testing.assert_allclose(batched['anomaly_scores'], single['anomaly_scores'])
+            self.assertEqual(batched['alerts'], single['alerts'])
+
+    def test_rejects_other_models(self):
+        """Test that non-IsolationForest models are not compiled."""
+        self.assertIsNone(_compile_isolation_forest(object()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for DeadlockDetector cycle detection.
+Tests that each deadlocked component of the wait-for graph is reported once.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadlock_detector_new import DeadlockDetector
+
+
+class TestDeadlockDetector(unittest.TestCase):
+    """Test cases for wait-for graph cycle detection."""
+
+    def setUp(self):
+        """Set up an empty detector."""
+        self.detector = DeadlockDetector()
+
+    def _assert_cycle(self, cycle):
+        """Assert consecutive nodes (wrapping around) are joined by wait edges."""
+        for i, node in enumerate(cycle):
+            self.assertIn(cycle[(i + 1) % len(cycle)], self.detector.wait_graph[node])
+
+    def test_no_cycles_in_acyclic_graph(self):
+        """Test an acyclic wait graph reports no risk."""
+        self.detector._add_wait_edge('T1', 'L1')
+        self.detector._add_wait_edge('L1', 'T2')
+        result = self.detector.detect()
+        self.assertFalse(result['risk'])
+        self.assertEqual(result['cycles'], [])
+
+    def test_one_cycle_per_component(self):
+        """Test each deadlocked component yields one valid cycle."""
+        # Dense component: every pair of T1..T4 waits on each other
+        threads = ['T1', 'T2', 'T3', 'T4']
+        for a in threads:
+            for b in threads:
+                if a != b:
+                    self.detector._add_wait_edge(a, b)
+        self.detector._add_wait_edge('T5', 'T6')
+        self.detector._add_wait_edge('T6', 'T5')
+        self.detector._add_wait_edge('T7', 'T7')
+        self.detector._add_wait_edge('T4', 'T5')
+
+        result = self.detector.detect()
+        self.assertTrue(result['risk'])
+        self.assertEqual(len(result['cycles']), 3)
+        self.assertEqual(sorted(len(c) for c in result['cycles'])[:2], [1, 2])
+        for cycle in result['cycles']:
+            self._assert_cycle(cycle)
+
+    def test_timeouts_on_held_locks_form_cycle(self):
+        """Test two threads timing out on each other's locks are reported as a cycle."""
+        self.assertTrue(self.detector.acquire_lock('T1', 'L1', timeout=0.01))
+        self.assertTrue(self.detector.acquire_lock('T2', 'L2', timeout=0.01))
+        self.assertFalse(self.detector.acquire_lock('T1', 'L2', timeout=0.01))
+        self.assertFalse(self.detector.acquire_lock('T2', 'L1', timeout=0.01))
+
+        result = self.detector.detect()
+        self.assertTrue(result['risk'])
+        self.assertEqual(sorted(result['cycles'][0]), ['T1', 'T2'])
+
+    def test_release_prunes_wait_edges(self):
+        """Test releasing a lock removes the edges of threads that waited on it."""
+        self.detector.acquire_lock('T1', 'L1', timeout=0.01)
+        self.detector.acquire_lock('T2', 'L1', timeout=0.01)
+        self.detector.acquire_lock('T3', 'L1', timeout=0.01)
+        self.assertEqual(self.detector.detect()['edges'], 2)
+
+        self.detector.release_lock('T1', 'L1')
+        result = self.detector.detect()
+        self.assertEqual(result['edges'], 0)
+        self.assertEqual(result['graph_size'], 0)
+        self.assertNotIn('L1', self.detector.holders)
+
+    def test_release_keeps_edge_while_other_held_lock_is_awaited(self):
+        """Test a waiter keeps its edge until the holder releases every lock it waits on."""
+        self.detector.acquire_lock('B', 'L1', timeout=0.01)
+        self.detector.acquire_lock('B', 'L2', timeout=0.01)
+        self.detector.acquire_lock('A', 'L1', timeout=0.01)
+        self.detector.acquire_lock('A', 'L2', timeout=0.01)
+
+        self.detector.release_lock('B', 'L1')
+        self.assertIn('B', self.detector.wait_graph['A'])
+
+        # B now waiting on A closes a cycle through the surviving A -> B wait
+        self.detector.acquire_lock('A', 'L3', timeout=0.01)
+        self.detector.acquire_lock('B', 'L3', timeout=0.01)
+        result = self.detector.detect()
+        self.assertTrue(result['risk'])
+        self.assertEqual(sorted(result['cycles'][0]), ['A', 'B'])
+
+        self.detector.release_lock('B', 'L2')
+        self.assertNotIn('B', self.detector.wait_graph.get('A', ()))
+
+    def test_release_by_non_holder_prunes_holder_edges(self):
+        """Test a release made under another thread ID still frees the recorded holder's waiters."""
+        self.detector.acquire_lock('H', 'L', timeout=0.01)
+        self.detector.acquire_lock('W', 'L', timeout=0.01)
+        self.detector.release_lock('X', 'L')
+        self.assertEqual(self.detector.detect()['edges'], 0)
+        self.assertEqual(dict(self.detector._wait_counts), {})
+
+        # L is free, so H waiting on W must not close a cycle
+        self.detector.acquire_lock('W', 'M', timeout=0.01)
+        self.detector.acquire_lock('H', 'M', timeout=0.01)
+        self.assertFalse(self.detector.detect()['risk'])
+
+
+if __name__ == '__main__':
+    unittest.main()
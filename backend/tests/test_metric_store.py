@@ -0,0 +1,78 @@
+"""
+Unit tests for MetricStore.
+Tests retention, time-window lookup and the metric dicts it rebuilds.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_store import MetricStore, METRIC_FIELDS, _UNKNOWN_PHASE
+
+
+def make_metric(t, phase='cpu_bound'):
+    """Build a profiling-loop style metric dict for timestamp t."""
+    metric = {'timestamp': float(t)}
+    metric.update((field, float(t) + i) for i, field in enumerate(METRIC_FIELDS))
+    metric.update(phase=phase, pid=42)
+    return metric
+
+
+class TestMetricStore(unittest.TestCase):
+    """Test cases for MetricStore."""
+
+    def test_records_roundtrip(self):
+        """Test that stored samples come back as the same dicts, in order."""
+        store = MetricStore(42, capacity=10)
+        metrics = [make_metric(t, phase) for t, phase in enumerate(['idle', 'io_bound', 'mixed'])]
+        for metric in metrics:
+            store.append(metric)
+
+        self.assertEqual(store.records(), metrics)
+        self.assertEqual(list(store.records()[0]), list(metrics[0]))
+        self.assertEqual(store.records(1, 2), metrics[1:2])
+        self.assertEqual(store.tail(2), metrics[1:])
+        self.assertEqual(store.latest(), metrics[-1])
+
+    def test_unknown_phase(self):
+        """Test that unrecognised phases are stored as the packed-frame code 255."""
+        store = MetricStore(42, capacity=10)
+        store.append(make_metric(0, 'bogus'))
+
+        self.assertEqual(store._phase[0], _UNKNOWN_PHASE)
+        self.assertEqual(_UNKNOWN_PHASE, 255)
+        self.assertEqual(store.latest()['phase'], 'unknown')
+
+    def test_capacity_drops_oldest(self):
+        """Test that only the last `capacity` samples survive repeated compaction."""
+        store = MetricStore(42, capacity=5)
+        for t in range(23):
+            store.append(make_metric(t))
+
+        self.assertEqual(len(store), 5)
+        self.assertEqual([m['timestamp'] for m in store.records()], [18.0, 19.0, 20.0, 21.0, 22.0])
+
+    def test_since(self):
+        """Test the wall-clock window lookup."""
+        store = MetricStore(42, capacity=100, start_time=1000.0)
+        for t in range(10):
+            store.append(make_metric(t))
+
+        # Cutoffs are wall-clock times; timestamps are relative to start_time
+        self.assertEqual([m['timestamp'] for m in store.since(1006.5)], [7.0, 8.0, 9.0])
+        self.assertEqual(store.since(1100), [])
+        self.assertEqual(len(store.since(999)), 10)
+
+    def test_empty(self):
+        """Test an empty store."""
+        store = MetricStore(42, capacity=3)
+        self.assertFalse(store)
+        self.assertIsNone(store.latest())
+        self.assertEqual(store.records(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Unit tests for PhasProfiler rule-based phase detection.
+Tests that the vectorized detect_phases() agrees with detect_phase().
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phaseprofiler import PhasProfiler
+
+
+class TestPhaseDetection(unittest.TestCase):
+    """Test cases for PhasProfiler phase rules."""
+
+    def setUp(self):
+        """Set up a profiler."""
+        self.profiler = PhasProfiler()
+
+    def test_detect_phases_matches_scalar(self):
+        """Test vectorized labels equal per-sample labels, including threshold edges."""
+        rng = np.random.default_rng(0)
+        cpu = rng.choice([5, 10, 50, 70, 71, 90], 2000).astype(float)
+        memory = rng.choice([20, 30, 50, 70, 71, 95], 2000).astype(float)
+        io_rate = rng.choice([0, 5, 10, 11, 50], 2000).astype(float)
+
+        expected = [self.profiler.detect_phase(c, m, io) for c, m, io in zip(cpu, memory, io_rate)]
+        self.assertEqual(self.profiler.detect_phases(cpu, memory, io_rate).tolist(), expected)
+
+    def test_detect_phase_ids_index_phases(self):
+        """Test that phase ids index PHASES to the same labels."""
+        cpu = [5.0, 90.0, 20.0, 20.0, 90.0]
+        memory = [10.0, 20.0, 20.0, 90.0, 90.0]
+        io_rate = [0.0, 0.0, 50.0, 0.0, 50.0]
+
+        ids = self.profiler.detect_phase_ids(cpu, memory, io_rate)
+        self.assertEqual(ids.dtype, np.uint8)
+        self.assertEqual([PhasProfiler.PHASES[i] for i in ids.tolist()],
+                         ['idle', 'cpu_bound', 'io_bound', 'memory_bound', 'mixed'])
+
+    def test_detect_phases_empty(self):
+        """Test that empty columns give no labels."""
+        self.assertEqual(self.profiler.detect_phases([], [], []).tolist(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Unit tests for ProcessSampler.
+Tests that /proc sampling reports the same counters psutil does.
+"""
+
+import unittest
+import os
+import sys
+
+import psutil
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from proc_sampler import ProcessSampler
+
+
+class TestProcessSampler(unittest.TestCase):
+    """Test cases for ProcessSampler."""
+
+    def test_sample_matches_psutil(self):
+        """Test memory counters agree with psutil and CPU usage is non-negative."""
+        sampler = ProcessSampler(os.getpid())
+        try:
+            sample = sampler.sample()
+        finally:
+            sampler.close()
+
+        rss_mb = psutil.Process().memory_info().rss / (1024 ** 2)
+        self.assertAlmostEqual(sample['memory_used_mb'], rss_mb, delta=16)
+        self.assertGreaterEqual(sample['cpu_percent'], 0)
+        self.assertEqual(set(sample), {'cpu_percent', 'memory_percent', 'memory_used_mb', 'disk_read_mb',
+                                       'disk_write_mb', 'network_sent_mb', 'network_recv_mb'})
+
+    def test_missing_process(self):
+        """Test that an unknown PID raises NoSuchProcess."""
+        with self.assertRaises(psutil.NoSuchProcess):
+            ProcessSampler(2 ** 22 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
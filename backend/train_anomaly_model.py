@@ -10,6 +10,8 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 
+from anomaly_detector import AnomalyDetector
+
 # Load data
 print("Loading final.csv...")
 df = pd.read_csv('data/final.csv')
@@ -93,4 +95,8 @@ joblib.dump(scaler, scaler_path)
 
 print(f"✅ Model saved: {model_path}")
 print(f"✅ Scaler saved: {scaler_path}")
+
+# Refresh the memory-mapped export; the old one no longer matches the pickle
+flat_path = AnomalyDetector(model_path).export_flat()
+print(f"✅ Flat export saved: {flat_path}")
 print(f"\nModel training complete!")
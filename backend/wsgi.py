@@ -0,0 +1,10 @@
+"""
+WSGI entry point for serving PhaseSentinel with gunicorn.
+See serve.sh in the repository root for the recommended command line.
+"""
+
+from app import app, socketio  # noqa: F401  (socketio registers its handlers on app)
+
+
+if __name__ == '__main__':
+    socketio.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,17 @@
+#!/bin/bash
+# PhaseSentinel production server (gunicorn instead of the Werkzeug dev server)
+#
+# Profiling sessions, metrics and Socket.IO rooms live in process memory, so
+# the app must run as a single worker process; concurrency comes from the
+# worker's thread pool instead. Requests that wait on psutil sampling, CSV
+# files or model inference then no longer queue behind each other.
+
+cd "$(dirname "$0")/backend" || exit 1
+
+exec gunicorn \
+    --worker-class gthread \
+    --workers 1 \
+    --threads "${THREADS:-32}" \
+    --timeout 120 \
+    --bind "${BIND:-0.0.0.0:5000}" \
+    wsgi:app